@@ -0,0 +1,95 @@
+import numpy as np
+from core.controller import MPCController
+
+
+class BatchPlantModel:
+    """N independent second-order plants held in contiguous arrays"""
+    def __init__(self, n, noise_level=0.0, seed=None):
+        self.n = n
+        self.position = np.zeros(n)
+        self.velocity = np.zeros(n)
+        # Per-instance disturbance standard deviation
+        self.noise_level = np.full(n, float(noise_level))
+        self.rng = np.random.default_rng(seed)
+        self._disturbance = np.zeros(n)
+        self._acceleration = np.empty(n)
+
+    def update(self, control_input, dt):
+        """Update all plants with one bulk disturbance draw"""
+        # Dynamics: x'' = u - 0.5*x' (damping) + disturbance
+        self.rng.standard_normal(out=self._disturbance)
+        self._disturbance *= self.noise_level
+
+        acc = self._acceleration
+        np.multiply(self.velocity, -0.5, out=acc)
+        acc += control_input
+        acc += self._disturbance
+        acc *= dt
+        self.velocity += acc
+        self.position += self.velocity * dt
+
+    def reset(self):
+        self.position[:] = 0.0
+        self.velocity[:] = 0.0
+
+    def set_noise(self, level):
+        self.noise_level[:] = level
+
+
+class BatchPIDController:
+    """PIDController over arrays of errors, with per-instance gains"""
+    def __init__(self, n, kp=2.0, ki=0.5, kd=0.1):
+        self.kp = np.full(n, float(kp))
+        self.ki = np.full(n, float(ki))
+        self.kd = np.full(n, float(kd))
+        self.integral = np.zeros(n)
+        self.last_error = np.zeros(n)
+
+    def compute(self, error, dt):
+        # Integral with anti-windup
+        self.integral += error * dt
+        np.clip(self.integral, -10.0, 10.0, out=self.integral)
+
+        derivative = (error - self.last_error) / dt if dt > 0 else 0.0
+        self.last_error[:] = error
+
+        return self.kp * error + self.ki * self.integral + self.kd * derivative
+
+    def reset(self):
+        self.integral[:] = 0.0
+        self.last_error[:] = 0.0
+
+
+class BatchHybridController:
+    """HybridController (HYBRID mode) for N plants stepped in lockstep"""
+    def __init__(self, n, noise_level=0.0, seed=None, mpc=None):
+        self.n = n
+        self.pid = BatchPIDController(n)
+        self.mpc = mpc if mpc is not None else MPCController()
+        self.plant = BatchPlantModel(n, noise_level, seed)
+
+    def set_pid_gains(self, kp, ki, kd):
+        self.pid.kp[:] = kp
+        self.pid.ki[:] = ki
+        self.pid.kd[:] = kd
+
+    def step(self, target, dt):
+        """Execute one control step for every plant; target is a scalar or (n,) array"""
+        error = target - self.plant.position
+
+        u_pid = self.pid.compute(error, dt)
+        u_mpc = self.mpc.compute_batch(self.plant.position, self.plant.velocity, target)
+
+        # Adaptive Blending
+        alpha = np.clip(np.abs(error) / 5.0, 0.0, 1.0)
+        u_final = np.clip(alpha * u_pid + (1 - alpha) * u_mpc, -10.0, 10.0)
+
+        self.plant.update(u_final, dt)
+        return self.plant.position.copy(), u_final, alpha
+
+    def reset(self):
+        self.pid.reset()
+        self.plant.reset()
+
+    def set_noise(self, level):
+        self.plant.set_noise(level)
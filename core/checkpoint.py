@@ -0,0 +1,205 @@
+import copy
+import json
+import os
+import threading
+import numpy as np
+import torch
+
+# Bump when the checkpoint layout changes
+CHECKPOINT_VERSION = 2
+
+# Replay fields stored as one .npy file each (memory-mapped on save and load)
+REPLAY_FIELDS = ("states", "actions", "rewards", "next_states", "dones")
+
+# Rows copied per buffer-lock hold while snapshotting the replay buffer
+COPY_CHUNK = 65536
+
+
+class Checkpointer:
+    """
+    Complete DDPG training state in one directory:
+      agent_<slot>.pt  networks, target networks, optimizers, counters
+      <field>.npy   replay buffer arrays (full capacity, memory-mapped)
+      priorities_<slot>.npy  sum-tree leaf priorities (prioritized replay only)
+      meta.json     buffer position/size, the `added` count of the last save
+                    and its slot ("a" or "b")
+    Saves are incremental: only transitions added since the previous save
+    are written. save() runs on a background thread by default.
+    Each save writes the slot meta.json does not point to and replaces
+    meta.json last, so an interrupted save keeps the previous weights,
+    optimizers and counters paired with the previous buffer position. Replay
+    rows are written in place, though: once the ring has wrapped, new rows
+    overwrite the oldest ones, so after an interrupted save some of the
+    previous checkpoint's oldest transitions may be replaced or torn.
+    """
+    def __init__(self, agent, directory):
+        self.agent = agent
+        self.directory = directory
+        self.thread = None
+        self.last_error = None
+        self._saved_added = None
+
+    @property
+    def saving(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def save(self, block=False):
+        """
+        Start a save; returns False if the previous one is still running.
+        Network weights are copied before returning, replay rows are copied in
+        short chunks on the writer thread.
+        """
+        if self.saving:
+            return False
+        with self.agent.train_lock:
+            state = copy.deepcopy(self.agent.state_dict())
+
+        self.last_error = None
+        self.thread = threading.Thread(target=self._save, args=(state,), daemon=True)
+        self.thread.start()
+        if block:
+            self.wait()
+        return True
+
+    def wait(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.last_error is not None:
+            raise self.last_error
+
+    def _save(self, state):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Alternate slots so the files meta.json points to are never overwritten
+            slot = "b" if self._read_meta().get("slot") == "a" else "a"
+            torch.save(state, self._path(f"agent_{slot}.pt"))
+            meta = self._save_replay(slot)
+            meta["version"] = CHECKPOINT_VERSION
+            meta["train_steps"] = state["train_steps"]
+            meta["slot"] = slot
+            self._write_meta(meta)
+        except Exception as e: # Reported through wait() / last_error
+            self.last_error = e
+            print(f"[CHECKPOINT] Save to {self.directory} failed: {e}")
+
+    def _save_replay(self, slot):
+        buf = self.agent.replay_buffer
+        with buf.lock:
+            added, ptr, size = buf.added, buf.ptr, buf.size()
+
+        # The first save of a Checkpointer that has not loaded this directory is a full one
+        previous = self._saved_added
+        if previous is None or not 0 <= added - previous < buf.max_size:
+            new_rows = min(added, buf.max_size)
+        else:
+            new_rows = added - previous
+
+        # Slots written since the last save, oldest first (at most two runs in the ring)
+        files = self._open_arrays(buf)
+        start = (ptr - new_rows) % buf.max_size
+        first = min(new_rows, buf.max_size - start)
+        for lo, hi in ((start, start + first), (0, new_rows - first)):
+            for chunk in range(lo, hi, COPY_CHUNK):
+                rows = slice(chunk, min(chunk + COPY_CHUNK, hi))
+                with buf.lock:
+                    parts = [getattr(buf, name)[rows].copy() for name in REPLAY_FIELDS]
+                for out, part in zip(files, parts):
+                    out[rows] = part
+
+        if buf.prioritized:
+            with buf.lock:
+                priorities = buf.tree.get(np.arange(buf.max_size))
+                max_priority = buf.max_priority
+            np.save(self._path(f"priorities_{slot}.npy"), priorities)
+        for out in files:
+            out.flush()
+        del files
+
+        self._saved_added = added
+        meta = {"added": added, "ptr": ptr, "size": size, "max_size": buf.max_size,
+                "state_dim": buf.states.shape[1], "action_dim": buf.actions.shape[1],
+                "prioritized": buf.prioritized}
+        if buf.prioritized:
+            meta["max_priority"] = max_priority
+        return meta
+
+    def _open_arrays(self, buf):
+        """Memory-mapped replay files, created at full capacity on first use"""
+        files = []
+        for name in REPLAY_FIELDS:
+            path = self._path(f"{name}.npy")
+            source = getattr(buf, name)
+            if os.path.exists(path):
+                out = np.load(path, mmap_mode="r+")
+                if out.shape == source.shape and out.dtype == source.dtype:
+                    files.append(out)
+                    continue
+                del out
+            files.append(np.lib.format.open_memmap(path, mode="w+", dtype=source.dtype,
+                                                   shape=source.shape))
+        return files
+
+    def load(self):
+        """
+        Restore the agent and its replay buffer. Returns False if there is no
+        checkpoint; raises ValueError for an incompatible one.
+        """
+        meta = self._read_meta()
+        if not meta:
+            return False
+        if meta.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint version {meta.get('version')} in {self.directory}, "
+                             f"expected {CHECKPOINT_VERSION}")
+
+        self.agent.load_state_dict(torch.load(self._path(f"agent_{meta['slot']}.pt")))
+        if self._load_replay(meta):
+            # Files already hold the restored rows; later saves append to them
+            self._saved_added = meta["added"]
+        else:
+            self._saved_added = None
+        return True
+
+    def _load_replay(self, meta):
+        """Returns True if the buffer now mirrors the checkpoint files slot for slot"""
+        buf = self.agent.replay_buffer
+        if (meta["state_dim"] != buf.states.shape[1]
+                or meta["action_dim"] != buf.actions.shape[1]):
+            raise ValueError("Checkpoint replay dimensions do not match the agent")
+
+        arrays = [np.load(self._path(f"{name}.npy"), mmap_mode="r") for name in REPLAY_FIELDS]
+        size, ptr = meta["size"], meta["ptr"]
+        if meta["max_size"] == buf.max_size:
+            with buf.lock:
+                for name, source in zip(REPLAY_FIELDS, arrays):
+                    getattr(buf, name)[:size] = source[:size]
+                buf.ptr, buf._size, buf.added = ptr, size, meta["added"]
+                if buf.prioritized:
+                    if meta["prioritized"]:
+                        priorities = np.load(self._path(f"priorities_{meta['slot']}.npy"))
+                        buf.tree.update(np.arange(size), priorities[:size])
+                        buf.max_priority = meta["max_priority"]
+                    else:
+                        buf.tree.update(np.arange(size), np.full(size, buf.max_priority))
+            return True
+
+        # Different capacity: replay the newest transitions in chronological order
+        order = np.arange(size) if size < meta["max_size"] else (ptr + np.arange(size)) % size
+        order = order[-buf.max_size:]
+        buf.add_batch(*(source[order] for source in arrays))
+        return False
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_meta(self, meta):
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, self._path("meta.json"))
@@ -1,5 +1,12 @@
+import threading
 import numpy as np
-from core.rl_agent import DDPGAgent
+from core.mpc_table import TABLE_DIR, load_or_build
+
+# Replay capacity of the interactive agent (rl_agent.MEMORY_SIZE is sized for headless/batch training)
+RL_MEMORY_SIZE = 10000
+# Torch intra-op threads of the interactive agent: its small batches gain little from
+# more, and the learner would otherwise compete with the control thread for every core
+RL_TORCH_THREADS = 1
 
 class PIDController:
     """Optimized PID Controller with Anti-Windup"""
@@ -32,45 +39,261 @@ class PIDController:
 
 
 class MPCController:
-    """Simplified Model Predictive Controller using Gradient Descent"""
-    def __init__(self, horizon=10, dt=0.1):
+    """
+    Model Predictive Controller.
+    method="grid": constant input over the horizon, vectorized grid search.
+    method="qp": full input sequence, condensed box-constrained QP.
+    method="explicit": interpolated lookup in a precomputed grid-search table.
+    """
+    def __init__(self, horizon=10, dt=0.1, method="grid", refine_levels=0):
         self.horizon = horizon
         self.dt = dt
+        self.method = method
+        self.u_min = -10.0
+        self.u_max = 10.0
+        
+        # Cost weights: q * error^2 + r * u^2 per horizon step
+        self.q_weight = 1.0
+        self.r_weight = 0.01
+        
+        # Grid search settings
+        self.n_candidates = 41
+        # Extra coarse-to-fine passes around the best candidate (0 = fixed grid)
+        self.refine_levels = refine_levels
+        
+        # QP solver settings
+        self.qp_max_iter = 50
+        self.qp_tol = 1e-9
+        self.u_plan = np.zeros(horizon)
+        
+        # Explicit table settings (grid over tracking error and velocity)
+        self.table_error_range = (-20.0, 20.0)
+        self.table_velocity_range = (-20.0, 20.0)
+        self.table_shape = (201, 201)
+        self.table_dir = TABLE_DIR
+        
+        self._gains_key = None
+        self._gain_v = None
+        self._gain_u = None
+        self._qp_key = None
+        self._qp = None
+        self._table_key = None
+        self._table = None
         
     def compute(self, current_state, target, dt):
         """
-        Simplified MPC using a grid search approach for low complexity.
+        Return the first control input of the optimal plan.
         current_state: [position, velocity]
         """
+        if self.method == "qp":
+            return self._compute_qp(current_state, target)
+        if self.method == "explicit":
+            position, velocity = current_state
+            return float(self.explicit_table().lookup(target - position, velocity))
+        return self._compute_grid(current_state, target)
+    
+    def explicit_table(self):
+        """Lazily load or build the explicit table for the current parameters"""
+        key = (self.horizon, self.dt, self.q_weight, self.r_weight, self.u_min, self.u_max,
+               self.n_candidates, self.refine_levels, tuple(self.table_error_range),
+               tuple(self.table_velocity_range), tuple(self.table_shape), self.table_dir)
+        if key != self._table_key:
+            self._table = load_or_build(self, self.table_error_range, self.table_velocity_range,
+                                        self.table_shape, self.table_dir)
+            self._table_key = key
+        return self._table
+    
+    def export_table(self, path):
+        """
+        Export the explicit table in the flat binary layout used by the native
+        controller. The values solve this controller's model (damping 0.5,
+        r_weight per step, self.dt), not the native compute_mpc; to keep the
+        native MPC unchanged, export ExplicitMPCTable.build_native(dt) instead.
+        """
+        self.explicit_table().export_native(path)
+    
+    def _compute_grid(self, current_state, target):
+        """Simplified MPC using a grid search approach for low complexity."""
         position, velocity = current_state
-        best_u = 0.0
-        min_cost = float('inf')
-        
-        # Search over control inputs
-        for u in np.linspace(-10, 10, 41):  # 41 points for precision
-            cost = self._predict_cost(position, velocity, u, target)
-            if cost < min_cost:
-                min_cost = cost
-                best_u = u
+        return float(self._grid_search(position, velocity, target))
+    
+    def _grid_search(self, position, velocity, target):
+        """
+        Grid search for any broadcastable batch of states and targets.
+        Returns the best constant input with the batch shape.
+        """
+        position, velocity, target = np.broadcast_arrays(
+            np.asarray(position, dtype=float), np.asarray(velocity, dtype=float),
+            np.asarray(target, dtype=float))
+        candidates = np.linspace(self.u_min, self.u_max, self.n_candidates)
+        step = candidates[1] - candidates[0]
+        
+        costs = self._predict_costs(position, velocity, candidates, target)
+        best_u = candidates[np.argmin(costs, axis=-1)]
+        
+        # Coarse-to-fine: re-grid around the current best at a finer spacing
+        offsets = np.linspace(-1.0, 1.0, 9)
+        for _ in range(self.refine_levels):
+            candidates = np.clip(best_u[..., None] + step * offsets, self.u_min, self.u_max)
+            step = step / 4.0
+            costs = self._predict_costs(position, velocity, candidates, target)
+            best_u = np.take_along_axis(candidates, np.argmin(costs, axis=-1)[..., None], axis=-1)[..., 0]
                 
         return best_u
     
-    def _predict_cost(self, pos, vel, u, target):
-        """Predict cost over horizon"""
-        cost = 0.0
-        p, v = pos, vel
+    def _prediction_gains(self):
+        """
+        Horizon response to a constant input, cached per (horizon, dt).
+        Predicted position at step k is pos + gain_v[k] * vel + gain_u[k] * u.
+        """
+        key = (self.horizon, self.dt)
+        if key != self._gains_key:
+            gain_v = np.empty(self.horizon)
+            gain_u = np.empty(self.horizon)
+            # Unit responses of the same integration scheme as PlantModel.update
+            pv, vv = 0.0, 1.0
+            pu, vu = 0.0, 0.0
+            for k in range(self.horizon):
+                vv += (-0.5 * vv) * self.dt
+                pv += vv * self.dt
+                vu += (1.0 - 0.5 * vu) * self.dt
+                pu += vu * self.dt
+                gain_v[k] = pv
+                gain_u[k] = pu
+            self._gain_v = gain_v
+            self._gain_u = gain_u
+            self._gains_key = key
+        return self._gain_v, self._gain_u
+    
+    def _predict_costs(self, pos, vel, u, target):
+        """
+        Predict cost over horizon for every candidate in one array computation.
+        pos, vel, target: batch shape B; u: candidates with shape B + (N,) or (N,).
+        """
+        gain_v, gain_u = self._prediction_gains()
+        pos = np.asarray(pos, dtype=float)
+        vel = np.asarray(vel, dtype=float)
+        u = np.asarray(u, dtype=float)
+        
+        # errors[..., n, k] = target - predicted position at step k for candidate n
+        free_error = (np.asarray(target, dtype=float) - pos)[..., None] - gain_v * vel[..., None]
+        errors = free_error[..., None, :] - u[..., None] * gain_u
         
-        for _ in range(self.horizon):
-            # Simple dynamics: acceleration = u - damping
-            accel = u - 0.5 * v
-            v += accel * self.dt
-            p += v * self.dt
+        # Cost: tracking error + control effort
+        return (self.q_weight * np.einsum('...k,...k->...', errors, errors)
+                + self.horizon * self.r_weight * u**2)
+    
+    def _qp_matrices(self):
+        """
+        Condensed QP data, cached per (horizon, dt, weights).
+        Predicted errors are free_error - S @ u, so up to a constant and a
+        factor of 2 the cost is 0.5 u'Hu - (q S'free_error)'u, H = q S'S + r I.
+        """
+        key = (self.horizon, self.dt, self.q_weight, self.r_weight)
+        if key != self._qp_key:
+            _, gain_u = self._prediction_gains()
+            # Impulse response: effect of u_j on position k depends only on k - j
+            impulse = np.diff(gain_u, prepend=0.0)
+            idx = np.arange(self.horizon)
+            lag = idx[:, None] - idx[None, :]
+            S = np.where(lag >= 0, impulse[np.clip(lag, 0, None)], 0.0)
             
-            # Cost: tracking error + control effort
-            error = target - p
-            cost += error**2 + 0.01 * u**2
+            hessian = self.q_weight * S.T @ S + self.r_weight * np.eye(self.horizon)
+            hessian_inv = np.linalg.inv(hessian)
+            
+            self._qp = {
+                # Unconstrained solution u = K @ free_error
+                "K": hessian_inv @ (self.q_weight * S.T),
+                # Cached factorization reused by the active-set iterations
+                "H_inv": hessian_inv,
+            }
+            self.u_plan = np.zeros(self.horizon)
+            self._qp_key = key
+        return self._qp
+    
+    def _compute_qp(self, current_state, target):
+        """Optimize the full input sequence with box constraints on u"""
+        position, velocity = current_state
+        qp = self._qp_matrices()
+        gain_v, _ = self._prediction_gains()
+        free_error = (target - position) - gain_v * velocity
+        
+        u = qp["K"] @ free_error
+        if u.min() < self.u_min or u.max() > self.u_max:
+            u = self._solve_box_qp(qp["H_inv"], u, self.u_plan)
+        
+        self.u_plan = u
+        return float(u[0])
+    
+    def compute_batch(self, positions, velocities, targets):
+        """
+        Batched counterpart of compute for arrays of states and targets.
+        QP plans are not kept between calls in batch mode.
+        """
+        if self.method == "explicit":
+            return self.explicit_table().lookup(np.asarray(targets) - positions, velocities)
+        if self.method != "qp":
+            return self._grid_search(positions, velocities, targets)
+        
+        qp = self._qp_matrices()
+        gain_v, _ = self._prediction_gains()
+        free_error = ((np.asarray(targets, dtype=float) - positions)[..., None]
+                      - gain_v * np.asarray(velocities, dtype=float)[..., None])
+        plans = free_error @ qp["K"].T
+        saturated = (plans.min(axis=-1) < self.u_min) | (plans.max(axis=-1) > self.u_max)
+        if saturated.any():
+            u_free = plans[saturated]
+            plans[saturated] = self._active_set(qp["H_inv"], u_free,
+                                                u_free < self.u_min, u_free > self.u_max)
+        return plans[..., 0]
+    
+    def _solve_box_qp(self, H_inv, u_free, prev_plan):
+        """
+        Primal-dual active set for min 0.5 u'Hu - b'u s.t. u_min <= u <= u_max,
+        where u_free = H^-1 b is the unconstrained optimum.
+        Warm-started from the saturated entries of the previous plan.
+        """
+        lower = np.zeros(self.horizon, dtype=bool)
+        upper = np.zeros(self.horizon, dtype=bool)
+        lower[:-1] = prev_plan[1:] <= self.u_min
+        upper[:-1] = prev_plan[1:] >= self.u_max
+        lower |= u_free < self.u_min
+        upper |= u_free > self.u_max
+        return self._active_set(H_inv, u_free[None], lower[None], upper[None])[0]
+    
+    def _active_set(self, H_inv, u_free, lower, upper):
+        """
+        Active-set iterations for a (plants, horizon) batch of box QPs sharing H,
+        starting from the lower/upper bound masks (updated in place).
+        Pinning u_A to its bounds gives u = u_free + H^-1[:, A] @ lam with
+        H^-1[A, A] @ lam = bound_A - u_free[A]; lam is the gradient on A.
+        Each row's system is embedded in a horizon x horizon matrix (identity on
+        the free entries, so lam is 0 there), and all rows whose active set is
+        still changing are solved together in one batched np.linalg.solve.
+        """
+        u = u_free.copy()
+        eye = np.eye(self.horizon)
+        rows = np.arange(len(u_free))
+        for _ in range(self.qp_max_iter):
+            lo, hi, free = lower[rows], upper[rows], u_free[rows]
+            active = lo | hi
+            system = np.where(active[:, :, None] & active[:, None, :], H_inv, eye)
+            rhs = np.where(active, np.where(hi, self.u_max, self.u_min) - free, 0.0)
+            lam = np.linalg.solve(system, rhs[..., None])[..., 0]
+            u_rows = free + lam @ H_inv.T
+            u[rows] = u_rows
             
-        return cost
+            # Release bounds whose multiplier has the wrong sign, pin new violations
+            new_lo = (lo & (lam > 0.0)) | (~hi & (u_rows < self.u_min - self.qp_tol))
+            new_hi = (hi & (lam < 0.0)) | (~lo & (u_rows > self.u_max + self.qp_tol))
+            changed = (new_lo != lo).any(axis=1) | (new_hi != hi).any(axis=1)
+            lower[rows] = new_lo
+            upper[rows] = new_hi
+            rows = rows[changed]
+            if rows.size == 0:
+                break
+        
+        return np.clip(u, self.u_min, self.u_max)
 
 
 class PlantModel:
@@ -103,11 +326,43 @@ class HybridController:
         self.mpc = MPCController()
         self.plant = PlantModel()
         
-        # RL Agent (State: [pos, vel, target, error], Action: [u])
-        self.rl_agent = DDPGAgent(state_dim=4, action_dim=1, max_action=10.0)
+        # RL Agent and learner are created on first use (see rl_agent), so
+        # HYBRID-only runs never import torch or allocate the replay buffer
+        self._rl_agent = None
+        self._learner = None
+        # Serializes lazy creation: the control thread and a set_mode caller may race
+        self._lazy_lock = threading.Lock()
         self.mode = "HYBRID" # HYBRID, RL_TRAIN, RL_INFERENCE
         self.training_steps = 0
         
+        # RL_TRAIN trains on a background learner thread unless disabled
+        self.async_training = True
+        
+    @property
+    def rl_agent(self):
+        """DDPG agent (State: [pos, vel, target, error], Action: [u])"""
+        if self._rl_agent is None:
+            with self._lazy_lock:
+                if self._rl_agent is None:
+                    from core.rl_agent import DDPGAgent
+                    agent = DDPGAgent(state_dim=4, action_dim=1, max_action=10.0,
+                                      memory_size=RL_MEMORY_SIZE, num_threads=RL_TORCH_THREADS)
+                    agent.freeze_policy() # NumPy actor snapshot for per-tick actions
+                    self._rl_agent = agent
+        return self._rl_agent
+    
+    @property
+    def learner(self):
+        if self._learner is None:
+            agent = self.rl_agent # Outside _lazy_lock, which it takes itself
+            with self._lazy_lock:
+                if self._learner is None:
+                    from core.learner import AsyncLearner
+                    from core.rl_agent import UTD_RATIO
+                    # Capped like inline training, so a fresh buffer is not overfitted
+                    self._learner = AsyncLearner(agent, sync_interval=50, utd_ratio=UTD_RATIO)
+        return self._learner
+        
     def set_pid_gains(self, kp, ki, kd):
         self.pid.kp = kp
         self.pid.ki = ki
@@ -146,7 +401,10 @@ class HybridController:
                 done = False # Continuous task
                 
                 self.rl_agent.replay_buffer.add(state, action, reward, next_state, done)
-                loss = self.rl_agent.train()
+                if self.learner.running:
+                    loss = self.learner.last_loss
+                else:
+                    loss = self.rl_agent.train()
                 self.training_steps += 1
                 
                 return self.plant.position, u_final, alpha, loss
@@ -173,7 +431,16 @@ class HybridController:
         self.plant.reset()
     
     def set_mode(self, mode):
+        # The agent and learner are built (and the learner started) before the
+        # control thread can see an RL mode; leaving RL_TRAIN stops the learner
+        # only after the control thread has switched away from it
+        if mode == "RL_TRAIN" and self.async_training:
+            self.learner.start()
+        elif mode in ("RL_TRAIN", "RL_INFERENCE"):
+            _ = self.rl_agent
         self.mode = mode
+        if mode != "RL_TRAIN" and self._learner is not None:
+            self._learner.stop()
     
     def set_noise(self, level):
         self.plant.set_noise(level)
@@ -0,0 +1,67 @@
+import threading
+import time
+from core.rl_agent import BATCH_SIZE, configure_torch_threads
+
+
+class AsyncLearner:
+    """
+    Trains a DDPGAgent continuously on a background thread.
+    The control loop only calls select_action and pushes transitions; updated
+    actor weights reach it through agent.publish_policy every sync_interval
+    gradient steps. Torch releases the GIL inside its kernels, so training
+    overlaps with the control thread instead of running inside its tick.
+    utd_ratio=None trains as fast as possible; a number caps gradient steps
+    at that many per transition added while the learner runs.
+    """
+    def __init__(self, agent, sync_interval=50, idle_sleep=0.005, utd_ratio=None):
+        self.agent = agent
+        self.sync_interval = sync_interval
+        self.idle_sleep = idle_sleep
+        self.utd_ratio = utd_ratio
+        self.running = False
+        self.thread = None
+
+        self.updates = 0
+        self.last_loss = 0.0
+        # Wall-clock learner throughput, refreshed every sync_interval updates
+        self.samples_per_sec = 0.0
+
+    def start(self):
+        if not self.running:
+            self.agent.detach_policy()
+            self.running = True
+            self.thread = threading.Thread(target=self._run_loop, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        # Hand the trained actor back to the control loop
+        self.agent.attach_policy()
+
+    def _run_loop(self):
+        if self.agent.num_threads is not None:
+            configure_torch_threads(self.agent.num_threads)
+        buffer = self.agent.replay_buffer
+        added_at_start = buffer.added
+        updates_at_start = self.updates
+        window_start = time.perf_counter()
+        while self.running:
+            if buffer.size() < BATCH_SIZE:
+                time.sleep(self.idle_sleep)
+                continue
+            if self.utd_ratio is not None:
+                allowed = self.utd_ratio * (buffer.added - added_at_start)
+                if self.updates - updates_at_start >= allowed:
+                    time.sleep(self.idle_sleep)
+                    continue
+
+            self.last_loss = self.agent.update()
+            self.updates += 1
+            if self.updates % self.sync_interval == 0:
+                self.agent.publish_policy()
+                now = time.perf_counter()
+                self.samples_per_sec = self.sync_interval * BATCH_SIZE / (now - window_start)
+                window_start = now
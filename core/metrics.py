@@ -0,0 +1,148 @@
+import numpy as np
+
+# Fields returned by step_metrics, one array entry per setpoint segment
+METRIC_FIELDS = ("run", "start", "t_start", "duration", "target", "initial", "step",
+                 "rise_time", "peak_time", "overshoot", "settling_time",
+                 "steady_state_error", "iae", "ise", "itae")
+
+
+def _as_array(values):
+    """values as a float64 array, or None for a ragged list of runs"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except ValueError:
+        return None
+
+
+def _flatten(time, target, output):
+    """
+    Concatenate runs given as 1-D arrays, (runs, samples) arrays or lists
+    of 1-D arrays of any lengths. Returns the flat arrays and run start offsets.
+    """
+    arrays = [_as_array(a) for a in (time, target, output)]
+    if all(a is not None and 1 <= a.ndim <= 2 for a in arrays):
+        time, target, output = arrays
+        if time.ndim == 1:
+            time, target, output = time[None], target[None], output[None]
+        if not time.shape == target.shape == output.shape:
+            raise ValueError("time, target and output must have the same shape")
+        lengths = np.full(time.shape[0], time.shape[1])
+        time, target, output = time.ravel(), target.ravel(), output.ravel()
+    else:
+        lengths = np.array([len(t) for t in time])
+        if [len(t) for t in target] != list(lengths) or [len(o) for o in output] != list(lengths):
+            raise ValueError("Every run needs matching time, target and output lengths")
+        time, target, output = (np.concatenate([np.asarray(r, dtype=np.float64) for r in a])
+                                for a in (time, target, output))
+    run_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return time, target, output, run_starts[lengths > 0], lengths[lengths > 0]
+
+
+def step_metrics(time, target, output, settle_band=0.02, rise_band=(0.1, 0.9), min_step=1e-6):
+    """
+    Step-response metrics for every setpoint segment of one or many runs.
+
+    A segment starts at each run start and at every change of `target`, and
+    lasts until the next one. Within a segment the response is normalized as
+    z = (output - initial) / (target - initial), initial being the output
+    just before the change (the first sample for a run's first segment), and:
+      rise_time      time from z >= rise_band[0] to z >= rise_band[1]
+      peak_time      time from the segment start to the largest z
+      overshoot      percent by which the peak of z exceeds 1 (>= 0)
+      settling_time  time until |output - target| stays within
+                     settle_band * |step| (NaN if it never settles)
+      steady_state_error  target - output at the segment's last sample
+      iae / ise / itae    integrals of |e|, e^2 and (t - t_start)|e|
+    Normalized metrics are NaN for segments with |step| < min_step or when a
+    band is never reached. All work is vectorized over the concatenated
+    samples (np.*.reduceat per segment), so cost is linear in total samples.
+
+    time, target, output: 1-D arrays (one run), (runs, samples) arrays or
+    lists of 1-D arrays (runs of different lengths).
+    Returns {field: np.ndarray} with one entry per segment (see METRIC_FIELDS).
+    """
+    time, target, output, run_starts, lengths = _flatten(time, target, output)
+    n = len(time)
+    if n == 0:
+        return {name: np.empty(0) for name in METRIC_FIELDS}
+
+    # 1. Segment boundaries: run starts plus target transitions inside runs
+    run_id = np.repeat(np.arange(len(run_starts)), lengths)
+    changes = np.flatnonzero((np.diff(target) != 0) & (np.diff(run_id) == 0)) + 1
+    starts = np.union1d(run_starts, changes)
+    ends = np.append(starts[1:], n)
+    seg_len = ends - starts
+    seg_id = np.repeat(np.arange(len(starts)), seg_len)
+    idx = np.arange(n)
+
+    # 2. Per-sample quantities relative to each segment
+    t0 = time[starts]
+    r = target[starts]
+    # Output just before the setpoint change (first sample at a run start)
+    y0 = output[np.where(np.isin(starts, run_starts), starts, starts - 1)]
+    step = r - y0
+    valid = np.abs(step) >= min_step
+    safe_step = np.where(valid, step, 1.0)
+
+    t_rel = time - t0[seg_id]
+    error = target - output
+    abs_error = np.abs(error)
+    z = (output - y0[seg_id]) / safe_step[seg_id]
+
+    # Sample widths: forward difference, last sample of each run reuses its predecessor's
+    dt = np.empty(n)
+    dt[:-1] = np.diff(time)
+    last_of_run = run_starts + lengths - 1
+    dt[last_of_run] = np.where(lengths > 1, dt[np.maximum(last_of_run - 1, 0)], 0.0)
+
+    # 3. First crossings of the rise band (index n = never reached)
+    def first_index(mask):
+        return np.minimum.reduceat(np.where(mask, idx, n), starts)
+
+    def time_at(indices):
+        found = indices < n
+        out = np.full(len(starts), np.nan)
+        out[found] = t_rel[indices[found]]
+        return out
+
+    rise_lo = time_at(first_index(z >= rise_band[0]))
+    rise_hi = time_at(first_index(z >= rise_band[1]))
+
+    # 4. Peak and overshoot
+    peak_z = np.maximum.reduceat(z, starts)
+    peak_idx = first_index(z >= peak_z[seg_id])
+
+    # 5. Settling: one past the last sample outside the band
+    band = settle_band * np.abs(safe_step)
+    outside = abs_error > band[seg_id]
+    last_out = np.maximum.reduceat(np.where(outside, idx, -1), starts)
+    settled = last_out < ends - 1
+    settling = np.full(len(starts), np.nan)
+    never_out = last_out < 0
+    settling[never_out] = 0.0
+    settle_at = settled & ~never_out
+    settling[settle_at] = t_rel[last_out[settle_at] + 1]
+
+    # 6. Error integrals
+    iae = np.add.reduceat(abs_error * dt, starts)
+    ise = np.add.reduceat(error * error * dt, starts)
+    itae = np.add.reduceat(t_rel * abs_error * dt, starts)
+
+    nan = np.nan
+    return {
+        "run": run_id[starts],
+        "start": starts - run_starts[run_id[starts]],
+        "t_start": t0,
+        "duration": time[ends - 1] - t0 + dt[ends - 1],
+        "target": r,
+        "initial": y0,
+        "step": step,
+        "rise_time": np.where(valid, rise_hi - rise_lo, nan),
+        "peak_time": np.where(valid, time_at(peak_idx), nan),
+        "overshoot": np.where(valid, np.maximum(peak_z - 1.0, 0.0) * 100.0, nan),
+        "settling_time": np.where(valid, settling, nan),
+        "steady_state_error": error[ends - 1],
+        "iae": iae,
+        "ise": ise,
+        "itae": itae,
+    }
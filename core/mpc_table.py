@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import warnings
+import numpy as np
+
+# Default location for cached explicit MPC tables
+TABLE_DIR = os.path.join(os.path.dirname(__file__), "mpc_tables")
+
+# Bump when the table layout or the way it is built changes
+TABLE_VERSION = 1
+
+# Model of compute_mpc in controller.c, which differs from MPCController:
+# x'' = u - 0.1*x', cost sum(error^2) + 0.1*u^2, candidates -10..10 in steps of 0.5
+NATIVE_HORIZON = 10
+NATIVE_DAMPING = 0.1
+NATIVE_R_WEIGHT = 0.1
+NATIVE_CANDIDATES = np.linspace(-10.0, 10.0, 41)
+
+
+def native_grid_search(position, velocity, target, dt):
+    """Vectorized compute_mpc (native model) for broadcastable arrays of states and targets"""
+    position, velocity, target = np.broadcast_arrays(
+        np.asarray(position, dtype=float), np.asarray(velocity, dtype=float),
+        np.asarray(target, dtype=float))
+    # Unit responses to the initial velocity and to a constant input
+    gain_v = np.empty(NATIVE_HORIZON)
+    gain_u = np.empty(NATIVE_HORIZON)
+    pv, vv, pu, vu = 0.0, 1.0, 0.0, 0.0
+    for k in range(NATIVE_HORIZON):
+        vv += (-NATIVE_DAMPING * vv) * dt
+        pv += vv * dt
+        vu += (1.0 - NATIVE_DAMPING * vu) * dt
+        pu += vu * dt
+        gain_v[k] = pv
+        gain_u[k] = pu
+
+    free_error = (target - position)[..., None] - gain_v * velocity[..., None]
+    errors = free_error[..., None, :] - NATIVE_CANDIDATES[:, None] * gain_u
+    costs = np.einsum('...k,...k->...', errors, errors) + NATIVE_R_WEIGHT * NATIVE_CANDIDATES**2
+    return NATIVE_CANDIDATES[np.argmin(costs, axis=-1)]
+
+
+class ExplicitMPCTable:
+    """
+    Offline MPC solution u*(error, velocity) on a regular grid.
+    Lookups use vectorized bilinear interpolation; queries outside the grid
+    are clamped to its edge.
+    """
+    def __init__(self, error_range, velocity_range, values, params_hash=""):
+        self.error_range = (float(error_range[0]), float(error_range[1]))
+        self.velocity_range = (float(velocity_range[0]), float(velocity_range[1]))
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.params_hash = params_hash
+
+        n_err, n_vel = self.values.shape
+        self._err_scale = (n_err - 1) / (self.error_range[1] - self.error_range[0])
+        self._vel_scale = (n_vel - 1) / (self.velocity_range[1] - self.velocity_range[0])
+
+    @classmethod
+    def build(cls, mpc, error_range, velocity_range, shape, params_hash="", chunk=4096):
+        """Solve the MPC at every grid point using the controller's batched grid search"""
+        errors = np.linspace(error_range[0], error_range[1], shape[0])
+        velocities = np.linspace(velocity_range[0], velocity_range[1], shape[1])
+        E, V = np.meshgrid(errors, velocities, indexing="ij")
+        E, V = E.ravel(), V.ravel()
+
+        # The plant is shift-invariant, so (position=-error, target=0) covers every target
+        values = np.empty(E.size)
+        for start in range(0, E.size, chunk):
+            sl = slice(start, start + chunk)
+            values[sl] = mpc._grid_search(-E[sl], V[sl], 0.0)
+
+        return cls(error_range, velocity_range, values.reshape(shape), params_hash)
+
+    @classmethod
+    def build_native(cls, dt, error_range=(-20.0, 20.0), velocity_range=(-20.0, 20.0),
+                     shape=(201, 201)):
+        """
+        Table of the native controller's own MPC (native_grid_search) for a
+        fixed step dt. This is the table to load into NativeController: one
+        built by MPCController solves a different model.
+        """
+        errors = np.linspace(error_range[0], error_range[1], shape[0])
+        velocities = np.linspace(velocity_range[0], velocity_range[1], shape[1])
+        E, V = np.meshgrid(errors, velocities, indexing="ij")
+        values = native_grid_search(-E, V, 0.0, dt)
+        return cls(error_range, velocity_range, values, f"native-dt{dt!r}")
+
+    def lookup(self, error, velocity):
+        """Bilinear interpolation of u* at (error, velocity); accepts arrays"""
+        n_err, n_vel = self.values.shape
+        x = (np.asarray(error, dtype=float) - self.error_range[0]) * self._err_scale
+        y = (np.asarray(velocity, dtype=float) - self.velocity_range[0]) * self._vel_scale
+        x = np.clip(x, 0.0, n_err - 1)
+        y = np.clip(y, 0.0, n_vel - 1)
+
+        i = np.minimum(x.astype(np.intp), n_err - 2)
+        j = np.minimum(y.astype(np.intp), n_vel - 2)
+        fx = x - i
+        fy = y - j
+
+        v = self.values
+        top = v[i, j] * (1.0 - fy) + v[i, j + 1] * fy
+        bottom = v[i + 1, j] * (1.0 - fy) + v[i + 1, j + 1] * fy
+        return top * (1.0 - fx) + bottom * fx
+
+    def save(self, path):
+        np.savez(path, values=self.values,
+                 error_range=np.array(self.error_range),
+                 velocity_range=np.array(self.velocity_range),
+                 params_hash=np.array(self.params_hash))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["error_range"], data["velocity_range"], data["values"],
+                       str(data["params_hash"]))
+
+    def export_native(self, path):
+        """
+        Write the flat float64 layout read by set_mpc_table in controller.c:
+        [n_err, n_vel, err_min, err_max, vel_min, vel_max, values (row-major, error-major)]
+        """
+        n_err, n_vel = self.values.shape
+        header = np.array([n_err, n_vel, *self.error_range, *self.velocity_range], dtype=np.float64)
+        with open(path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(self.values.tobytes())
+
+
+def table_params(mpc, error_range, velocity_range, shape):
+    """Everything the table values depend on"""
+    return {
+        "version": TABLE_VERSION,
+        "horizon": int(mpc.horizon),
+        "dt": float(mpc.dt),
+        "q_weight": float(mpc.q_weight),
+        "r_weight": float(mpc.r_weight),
+        "u_min": float(mpc.u_min),
+        "u_max": float(mpc.u_max),
+        "n_candidates": int(mpc.n_candidates),
+        "refine_levels": int(mpc.refine_levels),
+        "error_range": [float(x) for x in error_range],
+        "velocity_range": [float(x) for x in velocity_range],
+        "shape": [int(x) for x in shape],
+    }
+
+
+def params_hash(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_or_build(mpc, error_range, velocity_range, shape, table_dir=TABLE_DIR):
+    """Return the cached table for the controller's current parameters, building it if needed"""
+    key = params_hash(table_params(mpc, error_range, velocity_range, shape))
+    path = os.path.join(table_dir, f"mpc_{key}.npz")
+
+    if os.path.exists(path):
+        try:
+            table = ExplicitMPCTable.load(path)
+            if table.params_hash == key and table.values.shape == tuple(shape):
+                return table
+        except (OSError, ValueError, KeyError):
+            pass  # Corrupt or stale cache file, rebuild below
+
+    table = ExplicitMPCTable.build(mpc, error_range, velocity_range, shape, key)
+    try:
+        os.makedirs(table_dir, exist_ok=True)
+        table.save(path)
+    except OSError as e:
+        warnings.warn(f"Could not cache explicit MPC table at {path}: {e}", RuntimeWarning)
+    return table
@@ -0,0 +1,5 @@
+// Portable blend_signals for targets without an assembly version
+// Formula: result = mpc + alpha * (pid - mpc)
+double blend_signals(double pid_out, double mpc_out, double alpha) {
+    return mpc_out + alpha * (pid_out - mpc_out);
+}
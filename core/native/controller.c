@@ -1,5 +1,15 @@
 #include <math.h>
 #include <stdlib.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+// Symbol export for the shared library (DLL on Windows, .so/.dylib elsewhere)
+#if defined(_WIN32)
+#define EXPORT __declspec(dllexport)
+#else
+#define EXPORT __attribute__((visibility("default")))
+#endif
 
 // System State
 typedef struct {
@@ -9,80 +19,275 @@ typedef struct {
     double last_error;
 } SystemState;
 
-SystemState sys_state = {0.0, 0.0, 0.0, 0.0};
+// Explicit MPC table (optional, exported by ExplicitMPCTable.build_native(dt).export_native)
+// Layout: [n_err, n_vel, err_min, err_max, vel_min, vel_max, values...]
+typedef struct {
+    double* values;
+    int n_err;
+    int n_vel;
+    double err_min, err_max, vel_min, vel_max;
+} MpcTable;
+
+// Exported DDPG actor (optional, written by DDPGAgent.export_actor)
+// Layout: [n_in, n_h1, n_h2, n_out, max_action, W1, b1, W2, b2, W3, b3]
+// with each W stored row-major as (outputs x inputs), as in torch.nn.Linear
+typedef struct {
+    double* params;   // weights and biases, followed by n_h1 + n_h2 scratch values
+    int n_in, n_h1, n_h2, n_out;
+    double max_action;
+} Policy;
+
+// Control modes for ctrl_set_mode
+#define MODE_HYBRID 0
+#define MODE_RL 1
 
-// PID Parameters
-double Kp = 2.0;
-double Ki = 0.5;
-double Kd = 0.1;
+// One independent controller instance: all mutable state lives here, so
+// separate instances can be stepped from different threads concurrently
+typedef struct {
+    SystemState state;
+    // PID Parameters
+    double Kp;
+    double Ki;
+    double Kd;
+    MpcTable table;
+    Policy policy;
+    int mode;
+} Controller;
 
 // MPC Parameters
 #define HORIZON 10
-double dt = 0.1;
 
-// External Assembly Function
+// Blend Function (assembly on x86, C elsewhere; see Makefile)
 extern double blend_signals(double pid_out, double mpc_out, double alpha);
 
-// Exported functions for Python
-__declspec(dllexport) void init_system() {
-    sys_state.position = 0.0;
-    sys_state.velocity = 0.0;
-    sys_state.integral_error = 0.0;
-    sys_state.last_error = 0.0;
+static void controller_defaults(Controller* c) {
+    c->state.position = 0.0;
+    c->state.velocity = 0.0;
+    c->state.integral_error = 0.0;
+    c->state.last_error = 0.0;
+    c->Kp = 2.0;
+    c->Ki = 0.5;
+    c->Kd = 0.1;
+    c->table.values = NULL;
+    c->table.n_err = 0;
+    c->table.n_vel = 0;
+    c->policy.params = NULL;
+    c->mode = MODE_HYBRID;
+}
+
+// ---- Handle-based API ----
+
+EXPORT Controller* ctrl_create() {
+    Controller* c = (Controller*)malloc(sizeof(Controller));
+    if (c) controller_defaults(c);
+    return c;
+}
+
+EXPORT void ctrl_destroy(Controller* c) {
+    if (!c) return;
+    free(c->table.values);
+    free(c->policy.params);
+    free(c);
+}
+
+EXPORT void ctrl_reset(Controller* c) {
+    c->state.position = 0.0;
+    c->state.velocity = 0.0;
+    c->state.integral_error = 0.0;
+    c->state.last_error = 0.0;
+}
+
+EXPORT void ctrl_set_pid_params(Controller* c, double p, double i, double d) {
+    c->Kp = p;
+    c->Ki = i;
+    c->Kd = d;
+}
+
+EXPORT double ctrl_get_position(Controller* c) {
+    return c->state.position;
+}
+
+// Load an explicit MPC table; returns 0 on success, -1 on a malformed blob
+EXPORT int ctrl_set_mpc_table(Controller* c, const double* blob, int length) {
+    if (length < 6) return -1;
+    int n_err = (int)blob[0];
+    int n_vel = (int)blob[1];
+    if (n_err < 2 || n_vel < 2 || length != 6 + n_err * n_vel) return -1;
+    if (blob[3] <= blob[2] || blob[5] <= blob[4]) return -1;
+
+    double* values = (double*)malloc(sizeof(double) * n_err * n_vel);
+    if (!values) return -1;
+    for (int i = 0; i < n_err * n_vel; i++) values[i] = blob[6 + i];
+
+    free(c->table.values);
+    c->table.values = values;
+    c->table.n_err = n_err;
+    c->table.n_vel = n_vel;
+    c->table.err_min = blob[2];
+    c->table.err_max = blob[3];
+    c->table.vel_min = blob[4];
+    c->table.vel_max = blob[5];
+    return 0;
+}
+
+EXPORT void ctrl_clear_mpc_table(Controller* c) {
+    free(c->table.values);
+    c->table.values = NULL;
+    c->table.n_err = 0;
+    c->table.n_vel = 0;
+}
+
+// The plant loop feeds 4 observations and applies a single action
+static int policy_can_control(const Policy* p) {
+    return p->params && p->n_in == 4 && p->n_out == 1;
+}
+
+// Load an exported actor; returns 0 on success, -1 on a malformed blob.
+// The policy drives the plant once the mode is set to MODE_RL.
+EXPORT int ctrl_load_policy(Controller* c, const double* blob, int length) {
+    if (length < 5) return -1;
+    int n_in = (int)blob[0];
+    int n_h1 = (int)blob[1];
+    int n_h2 = (int)blob[2];
+    int n_out = (int)blob[3];
+    if (n_in < 1 || n_h1 < 1 || n_h2 < 1 || n_out < 1) return -1;
+    int n_params = n_h1 * (n_in + 1) + n_h2 * (n_h1 + 1) + n_out * (n_h2 + 1);
+    if (length != 5 + n_params) return -1;
+
+    double* params = (double*)malloc(sizeof(double) * (n_params + n_h1 + n_h2));
+    if (!params) return -1;
+    for (int i = 0; i < n_params; i++) params[i] = blob[5 + i];
+
+    free(c->policy.params);
+    c->policy.params = params;
+    c->policy.n_in = n_in;
+    c->policy.n_h1 = n_h1;
+    c->policy.n_h2 = n_h2;
+    c->policy.n_out = n_out;
+    c->policy.max_action = blob[4];
+    if (!policy_can_control(&c->policy)) c->mode = MODE_HYBRID;
+    return 0;
+}
+
+EXPORT void ctrl_clear_policy(Controller* c) {
+    free(c->policy.params);
+    c->policy.params = NULL;
+    c->mode = MODE_HYBRID;
+}
+
+// Select MODE_HYBRID or MODE_RL; returns -1 for MODE_RL without a usable policy
+EXPORT int ctrl_set_mode(Controller* c, int mode) {
+    if (mode == MODE_RL && !policy_can_control(&c->policy)) return -1;
+    if (mode != MODE_HYBRID && mode != MODE_RL) return -1;
+    c->mode = mode;
+    return 0;
+}
+
+// Dense layer y = W x + b, optionally followed by ReLU
+static const double* dense(const double* params, const double* x, int n_x, int n_y,
+                           double* y, int relu) {
+    const double* bias = params + n_y * n_x;
+    for (int r = 0; r < n_y; r++) {
+        const double* w = params + r * n_x;
+        double acc = 0.0;
+        #pragma omp simd reduction(+:acc)
+        for (int k = 0; k < n_x; k++) acc += w[k] * x[k];
+        acc += bias[r];
+        y[r] = (relu && acc < 0.0) ? 0.0 : acc;
+    }
+    return bias + n_y; // next layer's parameters
+}
+
+// Actor forward pass: max_action * tanh(l3(relu(l2(relu(l1(x))))))
+static void policy_forward(const Policy* p, const double* x, double* out) {
+    int n_params = p->n_h1 * (p->n_in + 1) + p->n_h2 * (p->n_h1 + 1) + p->n_out * (p->n_h2 + 1);
+    double* h1 = p->params + n_params;
+    double* h2 = h1 + p->n_h1;
+
+    const double* w = dense(p->params, x, p->n_in, p->n_h1, h1, 1);
+    w = dense(w, h1, p->n_h1, p->n_h2, h2, 1);
+    dense(w, h2, p->n_h2, p->n_out, out, 0);
+    for (int i = 0; i < p->n_out; i++) out[i] = p->max_action * tanh(out[i]);
 }
 
-__declspec(dllexport) void set_pid_params(double p, double i, double d) {
-    Kp = p;
-    Ki = i;
-    Kd = d;
+// Evaluate the loaded policy on one state (n_in values) into out (n_out values)
+EXPORT int ctrl_policy_action(Controller* c, const double* state, double* out) {
+    if (!c->policy.params) return -1;
+    policy_forward(&c->policy, state, out);
+    return 0;
 }
 
-__declspec(dllexport) double get_position() {
-    return sys_state.position;
+// Bilinear interpolation in the explicit table, clamped to the grid edge
+static double lookup_mpc_table(const MpcTable* t, double error, double velocity) {
+    double x = (error - t->err_min) * (t->n_err - 1) / (t->err_max - t->err_min);
+    double y = (velocity - t->vel_min) * (t->n_vel - 1) / (t->vel_max - t->vel_min);
+    if (x < 0.0) x = 0.0;
+    if (x > t->n_err - 1) x = t->n_err - 1;
+    if (y < 0.0) y = 0.0;
+    if (y > t->n_vel - 1) y = t->n_vel - 1;
+
+    int i = (int)x;
+    int j = (int)y;
+    if (i > t->n_err - 2) i = t->n_err - 2;
+    if (j > t->n_vel - 2) j = t->n_vel - 2;
+    double fx = x - i;
+    double fy = y - j;
+
+    const double* row0 = t->values + i * t->n_vel;
+    const double* row1 = row0 + t->n_vel;
+    double top = row0[j] * (1.0 - fy) + row0[j + 1] * fy;
+    double bottom = row1[j] * (1.0 - fy) + row1[j + 1] * fy;
+    return top * (1.0 - fx) + bottom * fx;
 }
 
 // PID Controller Implementation
-double compute_pid(double target, double dt) {
-    double error = target - sys_state.position;
-    sys_state.integral_error += error * dt;
-    double derivative = (error - sys_state.last_error) / dt;
-    sys_state.last_error = error;
-    
+static double compute_pid(Controller* c, double target, double dt) {
+    SystemState* s = &c->state;
+    double error = target - s->position;
+    s->integral_error += error * dt;
+    double derivative = (error - s->last_error) / dt;
+    s->last_error = error;
+
     // Anti-windup
-    if (sys_state.integral_error > 10.0) sys_state.integral_error = 10.0;
-    if (sys_state.integral_error < -10.0) sys_state.integral_error = -10.0;
+    if (s->integral_error > 10.0) s->integral_error = 10.0;
+    if (s->integral_error < -10.0) s->integral_error = -10.0;
 
-    return (Kp * error) + (Ki * sys_state.integral_error) + (Kd * derivative);
+    return (c->Kp * error) + (c->Ki * s->integral_error) + (c->Kd * derivative);
 }
 
 // Simplified MPC Implementation (Gradient Descent approach for low complexity)
-double compute_mpc(double target, double dt) {
-    double predicted_pos = sys_state.position;
-    double predicted_vel = sys_state.velocity;
+static double compute_mpc(const Controller* c, double target, double dt) {
+    double predicted_pos = c->state.position;
+    double predicted_vel = c->state.velocity;
     double best_u = 0.0;
     double min_cost = 1e9;
-    
+
+    // O(1) lookup when an explicit table has been loaded
+    if (c->table.values) {
+        return lookup_mpc_table(&c->table, target - predicted_pos, predicted_vel);
+    }
+
     // Simple search for optimal control action
-    // In a real rigorous system we would use a QP solver, but for "less complexity" 
+    // In a real rigorous system we would use a QP solver, but for "less complexity"
     // and speed in this demo, we check a range of control inputs.
     for (double u = -10.0; u <= 10.0; u += 0.5) {
         double cost = 0.0;
         double p = predicted_pos;
         double v = predicted_vel;
-        
+
         // Simulate forward
         for (int i = 0; i < HORIZON; i++) {
             double acceleration = u - 0.1 * v; // Simple dynamics: u - friction
             v += acceleration * dt;
             p += v * dt;
-            
+
             double error = target - p;
             cost += error * error; // Minimize squared error
         }
-        
+
         // Add control effort penalty
         cost += 0.1 * u * u;
-        
+
         if (cost < min_cost) {
             min_cost = cost;
             best_u = u;
@@ -92,41 +297,175 @@ double compute_mpc(double target, double dt) {
 }
 
 // Plant Physics (Second Order System)
-void update_physics(double u, double dt) {
+static void update_physics(Controller* c, double u, double dt) {
     // Dynamics: x'' = u - 0.5*x' (Damping)
-    double acceleration = u - 0.5 * sys_state.velocity;
-    sys_state.velocity += acceleration * dt;
-    sys_state.position += sys_state.velocity * dt;
+    double acceleration = u - 0.5 * c->state.velocity;
+    c->state.velocity += acceleration * dt;
+    c->state.position += c->state.velocity * dt;
 }
 
 // Main Step Function called by Python
-__declspec(dllexport) void step_system(double target, double dt, double* out_pos, double* out_u, double* out_alpha) {
+EXPORT void ctrl_step(Controller* c, double target, double dt, double* out_pos, double* out_u, double* out_alpha) {
+    if (c->mode == MODE_RL) {
+        // RL control: same observation as HybridController [pos, vel, target, error]
+        double obs[4] = {c->state.position, c->state.velocity, target, target - c->state.position};
+        double u_rl;
+        policy_forward(&c->policy, obs, &u_rl);
+        if (u_rl > 10.0) u_rl = 10.0;
+        if (u_rl < -10.0) u_rl = -10.0;
+
+        update_physics(c, u_rl, dt);
+        *out_pos = c->state.position;
+        *out_u = u_rl;
+        *out_alpha = 0.0; // Pure RL
+        return;
+    }
+
     // 1. Compute PID
-    double u_pid = compute_pid(target, dt);
-    
+    double u_pid = compute_pid(c, target, dt);
+
     // 2. Compute MPC
-    double u_mpc = compute_mpc(target, dt);
-    
+    double u_mpc = compute_mpc(c, target, dt);
+
     // 3. Compute Alpha (Adaptive Blending)
     // Large error -> Alpha close to 1 (PID)
     // Small error -> Alpha close to 0 (MPC)
-    double error = fabs(target - sys_state.position);
-    double alpha = error / 5.0; 
+    double error = fabs(target - c->state.position);
+    double alpha = error / 5.0;
     if (alpha > 1.0) alpha = 1.0;
     if (alpha < 0.0) alpha = 0.0;
-    
+
     // 4. Blend using Assembly function
     double u_final = blend_signals(u_pid, u_mpc, alpha);
-    
+
     // Clamp output
     if (u_final > 10.0) u_final = 10.0;
     if (u_final < -10.0) u_final = -10.0;
-    
+
     // 5. Update Physics
-    update_physics(u_final, dt);
-    
+    update_physics(c, u_final, dt);
+
     // 6. Return values
-    *out_pos = sys_state.position;
+    *out_pos = c->state.position;
     *out_u = u_final;
     *out_alpha = alpha;
 }
+
+// Batched stepping: one call runs n steps with per-step targets and writes the
+// trajectories into caller-provided arrays (each at least n doubles long)
+EXPORT void ctrl_step_many(Controller* c, const double* targets, long long n, double dt,
+                           double* out_pos, double* out_u, double* out_alpha) {
+    for (long long i = 0; i < n; i++) {
+        ctrl_step(c, targets[i], dt, &out_pos[i], &out_u[i], &out_alpha[i]);
+    }
+}
+
+// ---- Batched MPC kernel ----
+
+// Plants per block: small enough for the block state to stay in L1
+#define MPC_BLOCK 64
+
+// Grid-search MPC (same candidates, dynamics and cost as compute_mpc) for n
+// plants in structure-of-arrays layout. The innermost loops run across plants
+// so they vectorize; blocks are spread over OpenMP threads when built with
+// OPENMP=1 (n_threads <= 0 uses the OpenMP default).
+EXPORT void mpc_batch(const double* pos, const double* vel, const double* target,
+                      long long n, double dt, double* out_u, int n_threads) {
+    long long n_blocks = (n + MPC_BLOCK - 1) / MPC_BLOCK;
+#ifdef _OPENMP
+    if (n_threads <= 0) n_threads = omp_get_max_threads();
+    #pragma omp parallel for schedule(static) num_threads(n_threads)
+#else
+    (void)n_threads;
+#endif
+    for (long long b = 0; b < n_blocks; b++) {
+        long long start = b * MPC_BLOCK;
+        int m = (int)((n - start < MPC_BLOCK) ? n - start : MPC_BLOCK);
+        double p[MPC_BLOCK], v[MPC_BLOCK], cost[MPC_BLOCK];
+        double best_u[MPC_BLOCK], min_cost[MPC_BLOCK];
+
+        for (int j = 0; j < m; j++) {
+            best_u[j] = 0.0;
+            min_cost[j] = 1e9;
+        }
+
+        for (int k = 0; k <= 40; k++) {
+            double u = -10.0 + 0.5 * k;
+
+            #pragma omp simd
+            for (int j = 0; j < m; j++) {
+                p[j] = pos[start + j];
+                v[j] = vel[start + j];
+                cost[j] = 0.0;
+            }
+
+            // Simulate forward
+            for (int i = 0; i < HORIZON; i++) {
+                #pragma omp simd
+                for (int j = 0; j < m; j++) {
+                    double acceleration = u - 0.1 * v[j]; // Simple dynamics: u - friction
+                    v[j] += acceleration * dt;
+                    p[j] += v[j] * dt;
+
+                    double error = target[start + j] - p[j];
+                    cost[j] += error * error; // Minimize squared error
+                }
+            }
+
+            #pragma omp simd
+            for (int j = 0; j < m; j++) {
+                // Add control effort penalty
+                double c = cost[j] + 0.1 * u * u;
+                int better = c < min_cost[j];
+                min_cost[j] = better ? c : min_cost[j];
+                best_u[j] = better ? u : best_u[j];
+            }
+        }
+
+        for (int j = 0; j < m; j++) out_u[start + j] = best_u[j];
+    }
+}
+
+// ---- Legacy single-instance API (one process-wide default controller) ----
+
+static Controller default_ctrl = {
+    {0.0, 0.0, 0.0, 0.0}, 2.0, 0.5, 0.1, {NULL, 0, 0, 0.0, 0.0, 0.0, 0.0},
+    {NULL, 0, 0, 0, 0, 0.0}, MODE_HYBRID
+};
+
+EXPORT void init_system() {
+    ctrl_reset(&default_ctrl);
+}
+
+EXPORT void set_pid_params(double p, double i, double d) {
+    ctrl_set_pid_params(&default_ctrl, p, i, d);
+}
+
+EXPORT double get_position() {
+    return ctrl_get_position(&default_ctrl);
+}
+
+EXPORT int set_mpc_table(const double* blob, int length) {
+    return ctrl_set_mpc_table(&default_ctrl, blob, length);
+}
+
+EXPORT void clear_mpc_table() {
+    ctrl_clear_mpc_table(&default_ctrl);
+}
+
+EXPORT int load_policy(const double* blob, int length) {
+    return ctrl_load_policy(&default_ctrl, blob, length);
+}
+
+EXPORT int set_control_mode(int mode) {
+    return ctrl_set_mode(&default_ctrl, mode);
+}
+
+EXPORT void step_system(double target, double dt, double* out_pos, double* out_u, double* out_alpha) {
+    ctrl_step(&default_ctrl, target, dt, out_pos, out_u, out_alpha);
+}
+
+EXPORT void step_many(const double* targets, long long n, double dt,
+                      double* out_pos, double* out_u, double* out_alpha) {
+    ctrl_step_many(&default_ctrl, targets, n, dt, out_pos, out_u, out_alpha);
+}
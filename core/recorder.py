@@ -0,0 +1,274 @@
+import collections
+import json
+import os
+import threading
+import time
+import numpy as np
+
+# Bump when the recording layout changes
+RECORDING_VERSION = 1
+INDEX_FILE = "index.json"
+
+
+class TelemetryRecorder:
+    """
+    Streams every telemetry row to disk at full resolution.
+    record() only appends to a bounded deque (a GIL-atomic operation, no
+    locks), so the control loop never waits on I/O; when the queue is full
+    the row is counted in `dropped` instead of blocking. A writer thread
+    drains the queue into column-major .npy segments of segment_rows rows
+    (shape (channels, segment_rows), memory-mapped) and keeps index.json
+    up to date, so a recording can be read while it is still growing.
+    If the writer fails (disk full, permissions), the exception is kept in
+    `error`, later rows are counted as dropped, and stop() re-raises it.
+    """
+    def __init__(self, directory, channels, segment_rows=65536, max_queue=100000,
+                 poll_interval=0.02, index_interval=1.0):
+        self.directory = directory
+        self.channels = tuple(channels)
+        self.segment_rows = segment_rows
+        self.max_queue = max_queue
+        self.poll_interval = poll_interval
+        self.index_interval = index_interval
+
+        self.queue = collections.deque()
+        self.dropped = 0
+        self.rows_queued = 0
+        self.rows_written = 0
+        self.error = None # Exception that stopped the writer thread
+        self.running = False
+        self.thread = None
+
+        self._segments = [] # Index entries; the last one may still be filling
+        self._segment = None # Memory map of the open segment
+        self._last_time = None
+
+    def start(self):
+        if self.running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(os.path.join(self.directory, INDEX_FILE)):
+            raise FileExistsError(f"{self.directory} already holds a recording")
+        self._write_index(complete=False)
+        self.running = True
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Drain the queue, close the last segment and mark the recording complete"""
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            raise self.error
+
+    def record(self, row):
+        """Queue one row (a tuple in channel order); never blocks"""
+        if self.error is not None or len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self.rows_queued += 1
+        self.queue.append(row)
+
+    def record_many(self, rows):
+        """Queue an (n, channels) block as one item"""
+        if self.error is not None or len(self.queue) >= self.max_queue:
+            self.dropped += len(rows)
+            return
+        self.rows_queued += len(rows)
+        self.queue.append(np.array(rows, dtype=np.float64))
+
+    def _run_loop(self):
+        try:
+            self._write_loop()
+        except Exception as e: # Re-raised by stop()
+            self.error = e
+            # Rows queued (or being written) when it failed will never reach disk
+            self.queue.clear()
+            self.dropped += self.rows_queued - self.rows_written
+
+    def _write_loop(self):
+        last_index = time.perf_counter()
+        while True:
+            stopping = not self.running
+            items = [self.queue.popleft() for _ in range(len(self.queue))]
+            if items:
+                self._write_items(items)
+            elif stopping:
+                break
+            else:
+                time.sleep(self.poll_interval)
+
+            now = time.perf_counter()
+            if now - last_index >= self.index_interval:
+                self._flush()
+                last_index = now
+
+        self._flush()
+        self._segment = None
+        self._write_index(complete=True)
+
+    def _write_items(self, items):
+        # Consecutive single rows are stacked into one block
+        rows = []
+        for item in items:
+            if isinstance(item, np.ndarray):
+                if rows:
+                    self._write_block(np.array(rows, dtype=np.float64))
+                    rows = []
+                self._write_block(item)
+            else:
+                rows.append(item)
+        if rows:
+            self._write_block(np.array(rows, dtype=np.float64))
+
+    def _write_block(self, block):
+        t_col = self.channels.index("time") if "time" in self.channels else None
+        while len(block):
+            if self._segment is None:
+                self._open_segment()
+            entry = self._segments[-1]
+            filled = entry["rows"]
+            part = block[:self.segment_rows - filled]
+            block = block[len(part):]
+
+            self._segment[:, filled:filled + len(part)] = part.T
+            entry["rows"] = filled + len(part)
+            self.rows_written += len(part)
+
+            if t_col is not None:
+                times = part[:, t_col]
+                entry["t_min"] = min(entry["t_min"], float(times.min()))
+                entry["t_max"] = max(entry["t_max"], float(times.max()))
+                # Time restarts with every runner start(); readers need to know
+                if (self._last_time is not None and times[0] < self._last_time) or np.any(np.diff(times) < 0):
+                    entry["sorted"] = False
+                self._last_time = float(times[-1])
+
+            if entry["rows"] == self.segment_rows:
+                self._segment.flush()
+                self._segment = None
+                self._last_time = None
+                self._write_index(complete=False)
+
+    def _open_segment(self):
+        name = f"segment_{len(self._segments):05d}.npy"
+        self._segment = np.lib.format.open_memmap(
+            os.path.join(self.directory, name), mode="w+", dtype=np.float64,
+            shape=(len(self.channels), self.segment_rows))
+        self._segments.append({"file": name, "rows": 0, "t_min": float("inf"),
+                               "t_max": float("-inf"), "sorted": True})
+
+    def _flush(self):
+        if self._segment is not None:
+            self._segment.flush()
+        self._write_index(complete=False)
+
+    def _write_index(self, complete):
+        index = {
+            "version": RECORDING_VERSION,
+            "channels": list(self.channels),
+            "segment_rows": self.segment_rows,
+            "rows": self.rows_written,
+            "dropped": self.dropped,
+            "complete": complete,
+            "segments": [dict(entry) for entry in self._segments if entry["rows"] > 0],
+        }
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+
+class TelemetryReader:
+    """
+    Read access to a TelemetryRecorder directory. Segments are memory-mapped
+    on first use, so slicing a multi-GB recording only touches the pages of
+    the requested rows and channels. refresh() picks up rows written since
+    the index was last read (live recordings).
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._maps = {}
+        self.refresh()
+
+    def refresh(self):
+        with open(os.path.join(self.directory, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index["version"] != RECORDING_VERSION:
+            raise ValueError(f"Recording version {index['version']} in {self.directory}, "
+                             f"expected {RECORDING_VERSION}")
+        self.index = index
+        self.channels = tuple(index["channels"])
+        self.segments = index["segments"]
+        self._offsets = np.cumsum([0] + [s["rows"] for s in self.segments])
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def complete(self):
+        return self.index["complete"]
+
+    def time_range(self):
+        if not self.segments:
+            return None
+        return (min(s["t_min"] for s in self.segments), max(s["t_max"] for s in self.segments))
+
+    def _segment(self, i):
+        name = self.segments[i]["file"]
+        if name not in self._maps:
+            self._maps[name] = np.load(os.path.join(self.directory, name), mmap_mode="r")
+        return self._maps[name]
+
+    def _columns(self, channels):
+        if channels is None:
+            channels = self.channels
+        return channels, [self.channels.index(name) for name in channels]
+
+    def rows(self, start=0, stop=None, channels=None):
+        """{channel: array} for absolute rows [start, stop)"""
+        channels, cols = self._columns(channels)
+        start, stop, _ = slice(start, stop).indices(len(self))
+        parts = []
+        for i, seg in enumerate(self.segments):
+            lo = max(start - self._offsets[i], 0)
+            hi = min(stop - self._offsets[i], seg["rows"])
+            if lo < hi:
+                parts.append(self._segment(i)[cols, lo:hi])
+        return self._assemble(channels, parts)
+
+    def read(self, t_start=None, t_end=None, channels=None):
+        """
+        {channel: array} of the rows with t_start <= time <= t_end (open ends
+        when None), in recording order. Segments outside the range are skipped
+        via the index; sorted segments are cut with a binary search.
+        """
+        channels, cols = self._columns(channels)
+        t_col = self.channels.index("time")
+        lo_t = -np.inf if t_start is None else t_start
+        hi_t = np.inf if t_end is None else t_end
+
+        parts = []
+        for i, seg in enumerate(self.segments):
+            if seg["t_max"] < lo_t or seg["t_min"] > hi_t:
+                continue
+            data = self._segment(i)
+            times = data[t_col, :seg["rows"]]
+            if seg["sorted"]:
+                lo = np.searchsorted(times, lo_t, side="left")
+                hi = np.searchsorted(times, hi_t, side="right")
+                parts.append(data[cols, lo:hi])
+            else:
+                mask = (times >= lo_t) & (times <= hi_t)
+                parts.append(data[cols, :seg["rows"]][:, mask])
+        return self._assemble(channels, parts)
+
+    @staticmethod
+    def _assemble(channels, parts):
+        if parts:
+            block = np.concatenate(parts, axis=1)
+        else:
+            block = np.empty((len(channels), 0))
+        return {name: block[i] for i, name in enumerate(channels)}
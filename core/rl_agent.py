@@ -1,9 +1,13 @@
+import collections
+import copy
+import os
+import pickle
+import threading
+import time
 import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
-import random
-from collections import deque
 
 # Hyperparameters
 BATCH_SIZE = 64
@@ -11,7 +15,43 @@ GAMMA = 0.99
 TAU = 0.005
 LR_ACTOR = 1e-4
 LR_CRITIC = 1e-3
-MEMORY_SIZE = 10000
+MEMORY_SIZE = 1000000
+UTD_RATIO = 1.0 # Gradient steps per collected transition
+LOSS_HISTORY = 10000 # Critic losses kept for plotting
+
+
+def configure_torch_threads(num_threads=None, interop_threads=None):
+    """
+    Pin torch's CPU thread pools. num_threads defaults to the CPU count; small
+    MLP batches often train fastest with 1-2 threads. The inter-op pool can only
+    be sized before torch starts parallel work, so that part is best-effort.
+    """
+    torch.set_num_threads(num_threads or os.cpu_count() or 1)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            print("[RL] Inter-op threads already initialized; keeping "
+                  f"{torch.get_num_interop_threads()}")
+
+
+def make_adam(params, lr):
+    """Adam with the fused CPU kernel when this torch build has it, else the foreach one"""
+    params = list(params)
+    try:
+        return optim.Adam(params, lr=lr, fused=True)
+    except (RuntimeError, TypeError, ValueError):
+        return optim.Adam(params, lr=lr, foreach=True)
+
+
+def soft_update(target_params, params, tau):
+    """target <- target + tau * (source - target) over whole parameter lists"""
+    with torch.no_grad():
+        if hasattr(torch, "_foreach_lerp_"):
+            torch._foreach_lerp_(target_params, params, tau)
+        else:
+            for target, param in zip(target_params, params):
+                target.lerp_(param, tau)
 
 class Actor(nn.Module):
     def __init__(self, state_dim, action_dim, max_action):
@@ -38,64 +78,314 @@ class Critic(nn.Module):
         q = torch.relu(self.l2(q))
         return self.l3(q)
 
+class FrozenPolicy:
+    """
+    NumPy snapshot of an Actor for single-state inference in the control loop.
+    Weights live in preallocated float32 matrices and every forward pass writes
+    into preallocated buffers, so acting involves no tensors, autograd or
+    allocation. refresh() re-copies the weights in place.
+    """
+    def __init__(self, actor):
+        self.max_action = actor.max_action
+        self.layers = [(layer.weight.detach().numpy().copy(), layer.bias.detach().numpy().copy())
+                       for layer in (actor.l1, actor.l2, actor.l3)]
+        self.state = np.zeros(actor.l1.in_features, dtype=np.float32)
+        self.buffers = [np.zeros(w.shape[0], dtype=np.float32) for w, _ in self.layers]
+        self.version = None
+
+    def refresh(self, actor, version=None):
+        with torch.no_grad():
+            for (w, b), layer in zip(self.layers, (actor.l1, actor.l2, actor.l3)):
+                w[...] = layer.weight.numpy()
+                b[...] = layer.bias.numpy()
+        self.version = version
+
+    def __call__(self, state):
+        """Action for one state; the returned array is reused by the next call"""
+        x = self.state
+        x[...] = state
+        last = len(self.layers) - 1
+        for i, ((w, b), out) in enumerate(zip(self.layers, self.buffers)):
+            np.dot(w, x, out=out)
+            out += b
+            if i < last:
+                np.maximum(out, 0.0, out=out)
+            x = out
+        np.tanh(x, out=x)
+        x *= self.max_action
+        return x
+
+class SumTree:
+    """Array-backed sum tree over leaf priorities with vectorized batch updates and lookups"""
+    def __init__(self, capacity):
+        self.n_leaves = 1 << max(capacity - 1, 1).bit_length()
+        self.depth = self.n_leaves.bit_length() - 1
+        # Node 1 is the root; leaves live at [n_leaves, 2 * n_leaves)
+        self.tree = np.zeros(2 * self.n_leaves)
+    
+    def total(self):
+        return self.tree[1]
+    
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices) + self.n_leaves
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+    
+    def find(self, values):
+        """Leaf index whose cumulative priority interval contains each value"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= np.where(go_right, left_sum, 0.0)
+            nodes = left + go_right
+        return nodes - self.n_leaves
+    
+    def get(self, indices):
+        return self.tree[np.asarray(indices) + self.n_leaves]
+
+
 class ReplayBuffer:
-    def __init__(self, max_size=MEMORY_SIZE):
-        self.buffer = deque(maxlen=max_size)
+    """
+    Transitions stored in preallocated float32 arrays that share memory with
+    torch tensors, so sampling is one vectorized index per field.
+    prioritized=True samples proportionally to |TD error|^alpha via a sum tree.
+    """
+    def __init__(self, max_size=MEMORY_SIZE, state_dim=4, action_dim=1,
+                 prioritized=False, alpha=0.6, beta=0.4, eps=1e-6):
+        self.max_size = max_size
+        self.ptr = 0
+        self._size = 0
+        # Transitions ever added (checkpoints use it to append only new ones)
+        self.added = 0
+        # Guards writes against concurrent sampling by an asynchronous learner
+        self.lock = threading.Lock()
+        
+        self.states = np.zeros((max_size, state_dim), dtype=np.float32)
+        self.actions = np.zeros((max_size, action_dim), dtype=np.float32)
+        self.rewards = np.zeros((max_size, 1), dtype=np.float32)
+        self.next_states = np.zeros((max_size, state_dim), dtype=np.float32)
+        self.dones = np.zeros((max_size, 1), dtype=np.float32)
+        
+        # Zero-copy tensor views of the same memory
+        self._tensors = tuple(torch.from_numpy(a) for a in
+                              (self.states, self.actions, self.rewards, self.next_states, self.dones))
+        
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+        if prioritized:
+            self.tree = SumTree(max_size)
+            self.max_priority = 1.0
     
     def add(self, state, action, reward, next_state, done):
-        self.buffer.append((state, action, reward, next_state, done))
+        with self.lock:
+            i = self.ptr
+            self.states[i] = state
+            self.actions[i] = action
+            self.rewards[i] = reward
+            self.next_states[i] = next_state
+            self.dones[i] = done
+            if self.prioritized:
+                # New transitions get the highest priority so they are replayed at least once
+                self.tree.update([i], [self.max_priority])
+            
+            self.ptr = (i + 1) % self.max_size
+            self._size = min(self._size + 1, self.max_size)
+            self.added += 1
+    
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Append N transitions at once (arrays with a leading batch axis)"""
+        n = len(states)
+        n_added = n
+        if n > self.max_size:
+            # Only the newest max_size transitions would survive anyway
+            states, actions, rewards, next_states, dones = (
+                np.asarray(a)[-self.max_size:] for a in (states, actions, rewards, next_states, dones))
+            n = self.max_size
+        
+        with self.lock:
+            idx = (self.ptr + np.arange(n)) % self.max_size
+            self.states[idx] = states
+            self.actions[idx] = np.reshape(actions, (n, -1))
+            self.rewards[idx] = np.reshape(rewards, (n, 1))
+            self.next_states[idx] = next_states
+            self.dones[idx] = np.reshape(dones, (n, 1))
+            if self.prioritized:
+                self.tree.update(idx, np.full(n, self.max_priority))
+            
+            self.ptr = (self.ptr + n) % self.max_size
+            self._size = min(self._size + n, self.max_size)
+            self.added += n_added
     
     def sample(self, batch_size):
-        batch = random.sample(self.buffer, batch_size)
-        state, action, reward, next_state, done = map(np.stack, zip(*batch))
-        return state, action, reward, next_state, done
+        """
+        Returns (state, action, reward, next_state, done, weights, indices) with
+        tensor fields; weights are importance-sampling weights (None if uniform).
+        """
+        with self.lock:
+            if self.prioritized:
+                # Stratified proportional sampling: one draw per equal-mass segment
+                segment = self.tree.total() / batch_size
+                values = (np.arange(batch_size) + np.random.random_sample(batch_size)) * segment
+                indices = np.minimum(self.tree.find(values), self._size - 1)
+                
+                probs = self.tree.get(indices) / self.tree.total()
+                weights = (self._size * probs) ** -self.beta
+                weights = torch.from_numpy((weights / weights.max()).astype(np.float32)).reshape(-1, 1)
+            else:
+                indices = np.random.randint(0, self._size, size=batch_size)
+                weights = None
+            
+            idx = torch.from_numpy(indices)
+            state, action, reward, next_state, done = (t[idx] for t in self._tensors)
+        return state, action, reward, next_state, done, weights, indices
+    
+    def update_priorities(self, indices, td_errors):
+        priorities = (np.abs(td_errors) + self.eps) ** self.alpha
+        with self.lock:
+            self.tree.update(indices, priorities)
+            self.max_priority = max(self.max_priority, float(priorities.max()))
     
     def size(self):
-        return len(self.buffer)
+        return self._size
 
 class DDPGAgent:
-    def __init__(self, state_dim, action_dim, max_action):
+    def __init__(self, state_dim, action_dim, max_action, memory_size=MEMORY_SIZE, prioritized=False,
+                 utd_ratio=UTD_RATIO, num_threads=None):
+        # Also applied on the AsyncLearner thread, since OpenMP pools are per thread
+        self.num_threads = num_threads
+        if num_threads is not None:
+            configure_torch_threads(num_threads)
+        
         self.actor = Actor(state_dim, action_dim, max_action)
         self.actor_target = Actor(state_dim, action_dim, max_action)
         self.actor_target.load_state_dict(self.actor.state_dict())
-        self.actor_optimizer = optim.Adam(self.actor.parameters(), lr=LR_ACTOR)
+        self.actor_optimizer = make_adam(self.actor.parameters(), lr=LR_ACTOR)
         
         self.critic = Critic(state_dim, action_dim)
         self.critic_target = Critic(state_dim, action_dim)
         self.critic_target.load_state_dict(self.critic.state_dict())
-        self.critic_optimizer = optim.Adam(self.critic.parameters(), lr=LR_CRITIC)
+        self.critic_optimizer = make_adam(self.critic.parameters(), lr=LR_CRITIC)
+        
+        # Flat parameter lists for the foreach soft update, and a reusable loss
+        self._actor_params = list(self.actor.parameters())
+        self._actor_target_params = list(self.actor_target.parameters())
+        self._critic_params = list(self.critic.parameters())
+        self._critic_target_params = list(self.critic_target.parameters())
+        self.critic_criterion = nn.MSELoss()
+        
+        # Update-to-data ratio: gradient steps per train() call (fractions accumulate)
+        self.utd_ratio = utd_ratio
+        self._utd_credit = 0.0
+        # Time spent in gradient steps and steps taken since construction, for
+        # samples_per_sec (train_steps is restored from checkpoints, these are not)
+        self.train_time = 0.0
+        self.timed_steps = 0
         
-        self.replay_buffer = ReplayBuffer()
+        self.replay_buffer = ReplayBuffer(memory_size, state_dim, action_dim, prioritized=prioritized)
         self.state_dim = state_dim
         self.action_dim = action_dim
         self.max_action = max_action
-        self.loss_history = []
+        self.loss_history = collections.deque(maxlen=LOSS_HISTORY)
+        self.train_steps = 0
+        # Held for a whole training step, so checkpoints see consistent weights
+        self.train_lock = threading.Lock()
+        
+        # Behaviour policy used by select_action. It is the live actor unless an
+        # asynchronous learner owns training, in which case it is a copy that
+        # only changes when publish_policy() is called.
+        self.policy = self.actor
+        self.policy_lock = threading.Lock()
+        # Bumped whenever the behaviour policy's weights change
+        self.policy_version = 0
+        # NumPy snapshot of the behaviour policy (see freeze_policy)
+        self.frozen = None
+        
+    def freeze_policy(self, enabled=True):
+        """
+        Act through a FrozenPolicy snapshot instead of torch. The snapshot is
+        refreshed lazily when the behaviour policy changes: every inline training
+        step, or every publish_policy() while an async learner is running.
+        """
+        self.frozen = FrozenPolicy(self.policy) if enabled else None
         
     def select_action(self, state, noise=0.0):
-        state = torch.FloatTensor(state.reshape(1, -1))
-        action = self.actor(state).cpu().data.numpy().flatten()
+        if self.frozen is not None:
+            if self.frozen.version != self.policy_version:
+                with self.policy_lock:
+                    self.frozen.refresh(self.policy, self.policy_version)
+            action = self.frozen(state)
+        else:
+            state = torch.FloatTensor(state.reshape(1, -1))
+            with self.policy_lock, torch.no_grad():
+                action = self.policy(state).cpu().numpy().flatten()
         if noise != 0:
             action = (action + np.random.normal(0, noise, size=self.action_dim))
         return np.clip(action, -self.max_action, self.max_action)
     
+    def select_actions(self, states, noise=0.0):
+        """Batched select_action: one actor forward pass for an (N, state_dim) array"""
+        states = torch.from_numpy(np.ascontiguousarray(states, dtype=np.float32))
+        with self.policy_lock, torch.no_grad():
+            actions = self.policy(states).numpy()
+        if noise != 0:
+            actions = actions + np.random.normal(0, noise, size=actions.shape)
+        return np.clip(actions, -self.max_action, self.max_action)
+    
     def train(self):
+        """
+        Train after collecting one transition: utd_ratio gradient steps on
+        average. Returns the last critic loss.
+        """
         if self.replay_buffer.size() < BATCH_SIZE:
             return 0.0
-        
-        state, action, reward, next_state, done = self.replay_buffer.sample(BATCH_SIZE)
-        
-        state = torch.FloatTensor(state)
-        action = torch.FloatTensor(action)
-        reward = torch.FloatTensor(reward).reshape(-1, 1)
-        next_state = torch.FloatTensor(next_state)
-        done = torch.FloatTensor(done).reshape(-1, 1)
+        self._utd_credit += self.utd_ratio
+        n_steps = int(self._utd_credit)
+        self._utd_credit -= n_steps
+        return self.update(n_steps)
+    
+    def update(self, n_steps=1):
+        """Run n_steps gradient steps; returns the last critic loss"""
+        if self.replay_buffer.size() < BATCH_SIZE:
+            return 0.0
+        if n_steps <= 0:
+            return self.loss_history[-1] if self.loss_history else 0.0
+        start = time.perf_counter()
+        with self.train_lock:
+            for _ in range(n_steps):
+                loss_val = self._train_step()
+        self.train_time += time.perf_counter() - start
+        self.timed_steps += n_steps
+        return loss_val
+    
+    @property
+    def samples_per_sec(self):
+        """Minibatch samples consumed per second of training time"""
+        if self.train_time == 0.0:
+            return 0.0
+        return self.timed_steps * BATCH_SIZE / self.train_time
+    
+    def _train_step(self):
+        state, action, reward, next_state, done, weights, indices = self.replay_buffer.sample(BATCH_SIZE)
         
         # Critic Update
         target_Q = self.critic_target(next_state, self.actor_target(next_state))
         target_Q = reward + ((1 - done) * GAMMA * target_Q).detach()
         
         current_Q = self.critic(state, action)
-        critic_loss = nn.MSELoss()(current_Q, target_Q)
+        if weights is None:
+            critic_loss = self.critic_criterion(current_Q, target_Q)
+        else:
+            # Importance-weighted loss; new |TD error| becomes the replay priority
+            td_error = target_Q - current_Q
+            critic_loss = (weights * td_error.pow(2)).mean()
+            self.replay_buffer.update_priorities(indices, td_error.detach().numpy().ravel())
         
         self.critic_optimizer.zero_grad()
         critic_loss.backward()
@@ -109,24 +399,101 @@ class DDPGAgent:
         self.actor_optimizer.step()
         
         # Soft Update Targets
-        for param, target_param in zip(self.critic.parameters(), self.critic_target.parameters()):
-            target_param.data.copy_(TAU * param.data + (1 - TAU) * target_param.data)
+        soft_update(self._critic_target_params, self._critic_params, TAU)
+        soft_update(self._actor_target_params, self._actor_params, TAU)
             
-        for param, target_param in zip(self.actor.parameters(), self.actor_target.parameters()):
-            target_param.data.copy_(TAU * param.data + (1 - TAU) * target_param.data)
+        if self.policy is self.actor:
+            self.policy_version += 1
+        self.train_steps += 1
             
         loss_val = critic_loss.item()
         self.loss_history.append(loss_val)
         return loss_val
 
+    def detach_policy(self):
+        """Give select_action its own actor copy so training can run concurrently"""
+        with self.policy_lock:
+            if self.policy is self.actor:
+                self.policy = copy.deepcopy(self.actor)
+                self.policy_version += 1
+    
+    def attach_policy(self):
+        """Act with the live actor again (inline training)"""
+        with self.policy_lock:
+            self.policy = self.actor
+            self.policy_version += 1
+    
+    def publish_policy(self):
+        """Copy the current actor weights into the behaviour policy"""
+        if self.policy is self.actor:
+            self.policy_version += 1 # Nothing to copy, but snapshots are stale
+            return
+        with self.policy_lock, torch.no_grad():
+            for src, dst in zip(self.actor.parameters(), self.policy.parameters()):
+                dst.copy_(src)
+            self.policy_version += 1
+
+    def actor_blob(self):
+        """
+        Actor weights as one flat float64 array for the native controller:
+        [n_in, n_h1, n_h2, n_out, max_action, W1, b1, W2, b2, W3, b3]
+        (weights row-major as (outputs, inputs), like nn.Linear)
+        """
+        layers = (self.actor.l1, self.actor.l2, self.actor.l3)
+        header = [self.state_dim, self.actor.l1.out_features, self.actor.l2.out_features,
+                  self.action_dim, self.max_action]
+        with torch.no_grad():
+            parts = [np.asarray(header, dtype=np.float64)]
+            for layer in layers:
+                parts.append(layer.weight.detach().double().numpy().ravel())
+                parts.append(layer.bias.detach().double().numpy())
+        return np.concatenate(parts)
+
+    def export_actor(self, filename):
+        """Write actor_blob() to a raw binary file (loaded by NativeController.load_policy)"""
+        self.actor_blob().tofile(filename)
+
     def save(self, filename):
+        """Actor and critic weights only; see core.checkpoint for full training state"""
         torch.save(self.actor.state_dict(), filename + "_actor.pth")
         torch.save(self.critic.state_dict(), filename + "_critic.pth")
         
     def load(self, filename):
         try:
-            self.actor.load_state_dict(torch.load(filename + "_actor.pth"))
-            self.critic.load_state_dict(torch.load(filename + "_critic.pth"))
-            return True
-        except:
+            actor_state = torch.load(filename + "_actor.pth")
+            critic_state = torch.load(filename + "_critic.pth")
+            with self.train_lock:
+                self.actor.load_state_dict(actor_state)
+                self.critic.load_state_dict(critic_state)
+        except FileNotFoundError:
             return False
+        except (OSError, RuntimeError, pickle.UnpicklingError) as e:
+            print(f"[RL] Could not load weights from {filename}: {e}")
+            return False
+        self.publish_policy()
+        return True
+
+    def state_dict(self):
+        """Networks, target networks, optimizers and counters (replay buffer excluded)"""
+        return {
+            "actor": self.actor.state_dict(),
+            "critic": self.critic.state_dict(),
+            "actor_target": self.actor_target.state_dict(),
+            "critic_target": self.critic_target.state_dict(),
+            "actor_optimizer": self.actor_optimizer.state_dict(),
+            "critic_optimizer": self.critic_optimizer.state_dict(),
+            "train_steps": self.train_steps,
+            "loss_history": list(self.loss_history),
+        }
+
+    def load_state_dict(self, state):
+        with self.train_lock:
+            self.actor.load_state_dict(state["actor"])
+            self.critic.load_state_dict(state["critic"])
+            self.actor_target.load_state_dict(state["actor_target"])
+            self.critic_target.load_state_dict(state["critic_target"])
+            self.actor_optimizer.load_state_dict(state["actor_optimizer"])
+            self.critic_optimizer.load_state_dict(state["critic_optimizer"])
+            self.train_steps = state["train_steps"]
+            self.loss_history = collections.deque(state["loss_history"], maxlen=LOSS_HISTORY)
+        self.publish_policy()
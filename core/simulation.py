@@ -1,15 +1,36 @@
 import threading
 import time
 import numpy as np
-from collections import deque
 from core.controller import HybridController
+from core.metrics import step_metrics
+from core.recorder import TelemetryRecorder
+from core.spectrum import SlidingDFT
+from core.stats import RadarStats
+from core.telemetry import TelemetryRingBuffer
+
+# Telemetry channels, in recording order
+CHANNELS = ("time", "target", "position", "velocity", "control", "alpha",
+            "error", "p_term", "i_term", "d_term", "loss")
+
+
+def setpoint_schedule(breakpoints, steps, dt, initial=0.0):
+    """
+    Expand [(time, value), ...] breakpoints into a per-step target array.
+    Step i (sampled at (i + 1) * dt) uses the last breakpoint at or before it.
+    """
+    targets = np.full(steps, float(initial))
+    sample_times = (np.arange(steps) + 1) * dt
+    for t, value in sorted(breakpoints):
+        targets[sample_times >= t] = value
+    return targets
+
 
 class SimulationRunner:
     """
     Manages the control system simulation in a separate thread.
     Ensures precise timing and decouples physics from GUI rendering.
     """
-    def __init__(self, max_points=200, dt=0.05):
+    def __init__(self, max_points=200, dt=0.05, fft_window=64, fft_window_fn="rectangular"):
         self.controller = HybridController()
         self.dt = dt
         self.max_points = max_points
@@ -20,20 +41,17 @@ class SimulationRunner:
         # Simulation Parameters (Thread-safe access)
         self.target = 5.0
         
-        # Data Buffers (Deque for efficient O(1) appends and fixed size)
-        self.history = {
-            "time": deque(maxlen=max_points),
-            "target": deque(maxlen=max_points),
-            "position": deque(maxlen=max_points),
-            "velocity": deque(maxlen=max_points),
-            "control": deque(maxlen=max_points),
-            "alpha": deque(maxlen=max_points),
-            "error": deque(maxlen=max_points),
-            "p_term": deque(maxlen=max_points),
-            "i_term": deque(maxlen=max_points),
-            "d_term": deque(maxlen=max_points),
-            "loss": deque(maxlen=max_points)
-        }
+        # Data Buffer (preallocated columnar ring, one column per channel)
+        self.history = TelemetryRingBuffer(CHANNELS, max_points)
+        
+        # Streaming window statistics behind the radar chart
+        self.radar_stats = RadarStats(window=50)
+        
+        # Incremental spectrum of the error signal behind the FFT chart
+        self.spectrum = SlidingDFT(window=fft_window, bins=10, window_fn=fft_window_fn)
+        
+        # Optional full-resolution disk recording (see start_recording)
+        self.recorder = None
         
         self.start_time = 0.0
 
@@ -56,13 +74,33 @@ class SimulationRunner:
         
         with self.lock:
             self.controller.reset()
-            for key in self.history:
-                self.history[key].clear()
+            self.history.clear()
+            self.radar_stats.reset()
+            self.spectrum.reset()
             self.start_time = time.time()
             
         if was_running:
             self.start()
 
+    def start_recording(self, directory, **kwargs):
+        """Stream every tick to a TelemetryRecorder in `directory` (read back with TelemetryReader)"""
+        self.stop_recording()
+        recorder = TelemetryRecorder(directory, CHANNELS, **kwargs)
+        recorder.start()
+        self.recorder = recorder
+        return recorder
+    
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.stop()
+        return recorder
+
+    def checkpointer(self, directory):
+        """Checkpointer for the controller's RL agent (creates the agent, importing torch)"""
+        from core.checkpoint import Checkpointer
+        return Checkpointer(self.controller.rl_agent, directory)
+
     def set_target(self, value):
         self.target = value
 
@@ -89,33 +127,19 @@ class SimulationRunner:
             
             # 2. Capture Telemetry
             current_time = time.time() - self.start_time
-            vel = self.controller.plant.velocity
-            error = target - pos
+            row = self._telemetry(current_time, target, pos, u, alpha, loss)
+            vel, error = row[3], row[6]
             
-            # PID internals (accessing safely)
-            pid = self.controller.pid
-            p_term = pid.kp * error
-            i_term = pid.ki * pid.integral
-            d_term = pid.kd * ((error - pid.last_error)/self.dt if self.dt > 0 else 0)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.record(row) # Non-blocking; written by the recorder thread
             
-            # 3. Update History (Thread-safe deque append)
-            # Although deque is thread-safe for append/pop, we might want a lock 
-            # if we want to ensure all lists are synced when reading.
-            # For visualization, slight desync (one list having 1 more item) is usually fine.
-            # But let's use a lock for correctness during read/write if needed.
-            # For high perf, we can skip lock if we accept tearing, but let's be safe.
+            # 3. Update History
+            # The lock keeps readers from seeing a half-written row.
             with self.lock:
-                self.history["time"].append(current_time)
-                self.history["target"].append(target)
-                self.history["position"].append(pos)
-                self.history["velocity"].append(vel)
-                self.history["control"].append(u)
-                self.history["alpha"].append(alpha)
-                self.history["error"].append(error)
-                self.history["p_term"].append(p_term)
-                self.history["i_term"].append(i_term)
-                self.history["d_term"].append(d_term)
-                self.history["loss"].append(loss)
+                self.history.append(row)
+                self.radar_stats.update(error, vel, u)
+                self.spectrum.update(error)
             
             # 4. Precise Timing (Sleep until next tick)
             next_call = next_call + self.dt
@@ -126,66 +150,132 @@ class SimulationRunner:
                 # Lagging behind, skip sleep to catch up (or reset base if too far)
                 pass
 
+    def _telemetry(self, current_time, target, pos, u, alpha, loss):
+        """One telemetry row in CHANNELS order"""
+        vel = self.controller.plant.velocity
+        error = target - pos
+        
+        # PID internals (accessing safely)
+        pid = self.controller.pid
+        p_term = pid.kp * error
+        i_term = pid.ki * pid.integral
+        d_term = pid.kd * ((error - pid.last_error)/self.dt if self.dt > 0 else 0)
+        return current_time, target, pos, vel, u, alpha, error, p_term, i_term, d_term, loss
+
+    def run_headless(self, steps=None, targets=None):
+        """
+        Run the controller as fast as possible, without the thread or sleeping.
+        targets: None (use self.target), a scalar, or one target per step
+                 (see setpoint_schedule). steps defaults to len(targets).
+        Returns {channel: np.ndarray} with the full telemetry of the run;
+        simulated time advances by dt per step.
+        """
+        if self.running:
+            raise RuntimeError("Stop the real-time loop before a headless run")
+        
+        if targets is None:
+            targets = self.target
+        targets = np.asarray(targets, dtype=float)
+        if targets.ndim == 0:
+            if steps is None:
+                raise ValueError("steps is required with a constant target")
+            targets = np.full(steps, float(targets))
+        elif steps is None:
+            steps = len(targets)
+        elif len(targets) < steps:
+            raise ValueError(f"Need {steps} targets, got {len(targets)}")
+        
+        data = np.empty((steps, len(CHANNELS)))
+        dt = self.dt
+        step = self.controller.step
+        telemetry = self._telemetry
+        for i in range(steps):
+            target = float(targets[i])
+            pos, u, alpha, loss = step(target, dt)
+            data[i] = telemetry((i + 1) * dt, target, pos, u, alpha, loss)
+        
+        if self.recorder is not None:
+            self.recorder.record_many(data)
+        return {name: data[:, i] for i, name in enumerate(CHANNELS)}
+
+    @property
+    def sample_count(self):
+        """Total samples recorded since the last reset"""
+        return self.history.count
+
     def get_history(self):
-        """Return a snapshot of the history buffers"""
+        """Return a snapshot of the history buffers as {channel: np.ndarray}"""
+        return self.snapshot_history()[1]
+    
+    def snapshot_history(self, channels=CHANNELS):
+        """
+        (sample_count, {channel: np.ndarray}) for the given channels, taken
+        atomically, so the last history sample has absolute index sample_count - 1
+        """
+        columns = [self.history.columns[name] for name in channels]
         with self.lock:
-            # Convert to list to return a copy/snapshot for rendering
-            return {k: list(v) for k, v in self.history.items()}
+            # One contiguous copy; the per-channel arrays are views into it
+            data = self.history.view()[:, columns]
+            count = self.history.count
+        return count, {name: data[:, i] for i, name in enumerate(channels)}
+
+    def snapshot_since(self, count, channels=CHANNELS):
+        """
+        Incremental snapshot_history: (oldest, end, {channel: np.ndarray}) with
+        only the rows from absolute index max(count, oldest) to end - 1, where
+        oldest is the absolute index of the oldest row still in the history.
+        The lock is held just for copying those rows.
+        """
+        columns = [self.history.columns[name] for name in channels]
+        with self.lock:
+            view = self.history.view()
+            end = self.history.count
+            oldest = end - len(view)
+            new = max(0, end - max(count, oldest))
+            data = view[len(view) - new:, columns]
+        return oldest, end, {name: data[:, i] for i, name in enumerate(channels)}
+
+    def step_metrics(self, **kwargs):
+        """Step-response metrics per setpoint change in the current history (see core.metrics)"""
+        _, data = self.snapshot_history(("time", "target", "position"))
+        return step_metrics(data["time"], data["target"], data["position"], **kwargs)
+    
+    def latest_sample(self):
+        """Most recent telemetry row as {channel: value}, or None before the first step"""
+        with self.lock:
+            return self.history.latest()
             
     def get_latest_metrics(self):
         """Return the most recent values for telemetry cards"""
         with self.lock:
-            if not self.history["position"]:
-                return {k: 0.0 for k in self.history}
-            
-            return {
-                "Position": self.history["position"][-1],
-                "Target": self.history["target"][-1],
-                "Error": self.history["error"][-1],
-                "Velocity": self.history["velocity"][-1],
-                "Control (u)": self.history["control"][-1],
-                "Loss": self.history["loss"][-1]
-            }
+            row = self.history.latest()
+        if row is None:
+            return {k: 0.0 for k in CHANNELS}
+        
+        return {
+            "Position": row["position"],
+            "Target": row["target"],
+            "Error": row["error"],
+            "Velocity": row["velocity"],
+            "Control (u)": row["control"],
+            "Loss": row["loss"]
+        }
 
     def get_radar_metrics(self):
-        """Calculate system health metrics for the radar chart"""
+        """System health metrics for the radar chart, from the streaming window stats"""
         with self.lock:
-            if len(self.history["error"]) < 10:
+            if self.radar_stats.n < 10:
                 return [0.8, 0.7, 0.9, 0.6, 0.8] # Default/Initial
-
-            errors = np.array(self.history["error"])
-            controls = np.array(self.history["control"])
-            velocities = np.array(self.history["velocity"])
-            
-            # 1. Stability: Inverse of error variance (steadiness)
-            stability = 1.0 / (1.0 + np.var(errors[-50:]))
-            
-            # 2. Response: Based on velocity magnitude (responsiveness)
-            response = np.clip(np.mean(np.abs(velocities[-50:])) / 5.0, 0.2, 1.0)
-            
-            # 3. Accuracy: 1.0 - mean absolute error
-            accuracy = np.clip(1.0 - np.mean(np.abs(errors[-50:])), 0.0, 1.0)
             
-            # 4. Efficiency: Inverse of control effort
-            efficiency = 1.0 / (1.0 + np.mean(np.abs(controls[-50:])) * 0.1)
-            
-            # 5. Robustness: Simulated metric (can be linked to disturbance rejection)
-            robustness = 0.8 # Placeholder or complex calc
-            
-            return [stability, response, accuracy, efficiency, robustness]
+            return self.radar_stats.metrics(self.controller.plant.noise_level, self.dt)
 
     def get_fft_data(self):
-        """Compute FFT of the error signal"""
+        """Normalized error spectrum (first 10 bins) from the sliding DFT"""
         with self.lock:
-            if len(self.history["error"]) < 20:
+            if not self.spectrum.ready:
                 return np.zeros(10)
-                
-            # Use last 64 points for FFT
-            data = list(self.history["error"])[-64:]
-            if len(data) < 64:
-                return np.zeros(10)
-                
-            fft_vals = np.abs(np.fft.fft(data))[:10] # First 10 frequencies
-            # Normalize
-            fft_vals = fft_vals / (np.max(fft_vals) + 1e-6)
-            return fft_vals
+            fft_vals = self.spectrum.magnitudes()
+            
+        # Normalize
+        fft_vals = fft_vals / (np.max(fft_vals) + 1e-6)
+        return fft_vals
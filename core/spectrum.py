@@ -0,0 +1,80 @@
+import numpy as np
+
+# Cosine-sum windows: w[n] = a0 - a1*cos(2*pi*n/N) + a2*cos(4*pi*n/N) - ...
+WINDOWS = {
+    "rectangular": (1.0,),
+    "hann": (0.5, 0.5),
+    "hamming": (0.54, 0.46),
+    "blackman": (0.42, 0.5, 0.08),
+}
+
+
+class SlidingDFT:
+    """
+    Incremental DFT of the last `window` samples for the first `bins` bins.
+    Each update is O(bins); cosine-sum windows are applied in the frequency
+    domain as a short convolution across neighbouring bins. The tracked bins
+    are recomputed exactly once per window length to stop rounding drift.
+    """
+    def __init__(self, window=64, bins=10, window_fn="rectangular"):
+        if window_fn not in WINDOWS:
+            raise ValueError(f"Unknown window function '{window_fn}', expected one of {sorted(WINDOWS)}")
+        if bins + len(WINDOWS[window_fn]) - 1 > window:
+            raise ValueError(f"window of {window} samples is too short for {bins} bins")
+        self.window = window
+        self.bins = bins
+        self.window_fn = window_fn
+        self._coeffs = WINDOWS[window_fn]
+
+        # Track extra bins so the window convolution has its neighbours
+        self._n_tracked = bins + len(self._coeffs) - 1
+        self._k = np.arange(self._n_tracked)
+        self._twiddle = np.exp(2j * np.pi * self._k / window)
+        self.reset()
+
+    def reset(self):
+        self._samples = np.zeros(self.window)
+        self._head = 0
+        self._since_resync = 0
+        self.count = 0
+        self._X = np.zeros(self._n_tracked, dtype=complex)
+
+    @property
+    def ready(self):
+        """True once a full window of samples has been seen"""
+        return self.count >= self.window
+
+    def update(self, x):
+        old = self._samples[self._head]
+        self._samples[self._head] = x
+        self._head = (self._head + 1) % self.window
+        self.count += 1
+
+        # X_k <- (X_k + x_new - x_old) * e^(j*2*pi*k/N)
+        self._X += x - old
+        self._X *= self._twiddle
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+
+    def _resync(self):
+        ordered = np.roll(self._samples, -self._head)
+        self._X = np.fft.fft(ordered)[:self._n_tracked]
+        self._since_resync = 0
+
+    def spectrum(self):
+        """Windowed complex DFT of the current window, bins 0..bins-1"""
+        X = self._X
+        k = self._k[:self.bins]
+        out = self._coeffs[0] * X[:self.bins]
+        for m in range(1, len(self._coeffs)):
+            # Neighbour k - m for k < m wraps to the conjugate of bin m - k (real input)
+            below = X[np.abs(k - m)]
+            lower = np.where(k >= m, below, np.conj(below))
+            upper = X[m:m + self.bins]
+            out = out + (-1) ** m * 0.5 * self._coeffs[m] * (lower + upper)
+        return out
+
+    def magnitudes(self):
+        return np.abs(self.spectrum())
@@ -0,0 +1,80 @@
+import builtins
+import sys
+import time
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# Packages whose presence in sys.modules is worth reporting (lazy-loaded ones)
+HEAVY_MODULES = ("torch", "mpl_toolkits.mplot3d", "customtkinter", "matplotlib")
+
+
+class ImportProfiler:
+    """
+    Import-time breakdown by top-level package while active.
+    Wraps builtins.__import__ and charges each first-time import its self
+    time (nested imports are charged to their own package), so the totals
+    add up to the wall time spent importing.
+    """
+    def __init__(self):
+        self.totals = {}
+        self.stages = []
+        self._stack = []
+        self._original = None
+        self._t0 = None
+
+    def __enter__(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+        return False
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            package = name.partition(".")[0]
+            self.totals[package] = self.totals.get(package, 0.0) + elapsed - nested
+
+    def stage(self, label):
+        """Mark the end of a startup stage (time since the previous mark)"""
+        now = time.perf_counter()
+        last = self.stages[-1][2] if self.stages else self._t0
+        self.stages.append((label, now - last, now))
+
+    def report(self, top=10):
+        lines = ["[STARTUP] Stages:"]
+        for label, duration, _ in self.stages:
+            lines.append(f"  {label:<28s} {duration * 1000:8.1f} ms")
+
+        lines.append("[STARTUP] Import time by package (self time):")
+        ranked = sorted(self.totals.items(), key=lambda item: item[1], reverse=True)
+        for package, seconds in ranked[:top]:
+            lines.append(f"  {package:<28s} {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'total':<28s} {sum(self.totals.values()) * 1000:8.1f} ms")
+
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        deferred = [name for name in HEAVY_MODULES if name not in sys.modules]
+        lines.append(f"[STARTUP] Loaded: {', '.join(loaded) or '-'} | Deferred: {', '.join(deferred) or '-'}")
+
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in KiB on Linux, bytes on macOS
+            peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+            lines.append(f"[STARTUP] Peak RSS: {peak_mb:.0f} MB")
+        return "\n".join(lines)
@@ -0,0 +1,119 @@
+import math
+
+
+class RollingStats:
+    """
+    Rolling-window mean, variance and mean absolute value, O(1) per sample.
+    Uses a windowed Welford update; the sums are re-derived from the window
+    once per `window` samples so floating-point drift cannot accumulate.
+    """
+    def __init__(self, window=50):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._buf = [0.0] * self.window
+        self._i = 0
+        self._since_resync = 0
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._abs_sum = 0.0
+
+    def update(self, x):
+        x = float(x)
+        if self.n < self.window:
+            self.n += 1
+            delta = x - self.mean
+            self.mean += delta / self.n
+            self._m2 += delta * (x - self.mean)
+            self._abs_sum += abs(x)
+        else:
+            old = self._buf[self._i]
+            new_mean = self.mean + (x - old) / self.n
+            self._m2 += (x - old) * (x - new_mean + old - self.mean)
+            self.mean = new_mean
+            self._abs_sum += abs(x) - abs(old)
+
+        self._buf[self._i] = x
+        self._i = (self._i + 1) % self.window
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+
+    def _resync(self):
+        values = self._buf if self.n == self.window else self._buf[:self.n]
+        self.mean = math.fsum(values) / self.n
+        self._m2 = math.fsum((v - self.mean) ** 2 for v in values)
+        self._abs_sum = math.fsum(abs(v) for v in values)
+        self._since_resync = 0
+
+    @property
+    def variance(self):
+        """Population variance of the window (same as np.var)"""
+        return max(self._m2 / self.n, 0.0) if self.n else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def mean_abs(self):
+        return self._abs_sum / self.n if self.n else 0.0
+
+
+class RadarStats:
+    """Streaming inputs for SimulationRunner.get_radar_metrics"""
+    def __init__(self, window=50):
+        self.window = window
+        self.error = RollingStats(window)
+        self.velocity = RollingStats(window)
+        self.control = RollingStats(window)
+
+    def reset(self):
+        self.error.reset()
+        self.velocity.reset()
+        self.control.reset()
+
+    def update(self, error, velocity, control):
+        self.error.update(error)
+        self.velocity.update(velocity)
+        self.control.update(control)
+
+    @property
+    def n(self):
+        return self.error.n
+
+    def rejection_ratio(self, noise_level, dt):
+        """
+        Closed-loop error spread relative to the open-loop spread the same
+        disturbance would cause: white acceleration noise of std noise_level
+        integrated twice over n steps has position std noise_level*dt^2*n^1.5/sqrt(3).
+        0 means fully rejected, 1 means no better than open loop. Setpoint
+        transients inside the window also count as error spread, so the
+        ratio is pessimistic until the loop settles.
+        """
+        if noise_level <= 0 or self.n == 0:
+            return 0.0
+        open_loop = noise_level * dt * dt * self.n ** 1.5 / math.sqrt(3.0)
+        return self.error.std / open_loop
+
+    def metrics(self, noise_level, dt):
+        """[stability, response, accuracy, efficiency, robustness] in O(1)"""
+        # 1. Stability: Inverse of error variance (steadiness)
+        stability = 1.0 / (1.0 + self.error.variance)
+
+        # 2. Response: Based on velocity magnitude (responsiveness)
+        response = min(max(self.velocity.mean_abs / 5.0, 0.2), 1.0)
+
+        # 3. Accuracy: 1.0 - mean absolute error
+        accuracy = min(max(1.0 - self.error.mean_abs, 0.0), 1.0)
+
+        # 4. Efficiency: Inverse of control effort
+        efficiency = 1.0 / (1.0 + self.control.mean_abs * 0.1)
+
+        # 5. Robustness: Disturbance rejection against the injected noise level
+        robustness = min(max(1.0 - self.rejection_ratio(noise_level, dt), 0.0), 1.0)
+
+        return [stability, response, accuracy, efficiency, robustness]
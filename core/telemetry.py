@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class TelemetryRingBuffer:
+    """
+    Preallocated columnar ring buffer, one float64 column per channel.
+    Every row is written twice (at i and i + capacity), so the most recent
+    rows are always one contiguous block and view() never has to copy.
+    """
+    def __init__(self, channels, capacity):
+        self.channels = tuple(channels)
+        self.columns = {name: i for i, name in enumerate(self.channels)}
+        self.capacity = capacity
+        self._data = np.zeros((2 * capacity, len(self.channels)))
+        self._head = 0      # Next write slot in [0, capacity)
+        self.count = 0      # Total rows ever appended (monotonic sample counter)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, row):
+        """Append one row of values in channel order"""
+        head = self._head
+        self._data[head] = row
+        self._data[head + self.capacity] = row
+        self._head = head + 1 if head + 1 < self.capacity else 0
+        self.count += 1
+
+    def clear(self):
+        self._head = 0
+        self.count = 0
+
+    def view(self):
+        """
+        Zero-copy (n, channels) view of the buffered rows, oldest first.
+        Only valid until the next append; hold the writer's lock while using it.
+        """
+        end = self._head + self.capacity
+        return self._data[end - len(self):end]
+
+    def column(self, name):
+        """Zero-copy view of one channel, oldest first"""
+        return self.view()[:, self.columns[name]]
+
+    def snapshot(self):
+        """One contiguous copy of the buffered rows, safe to use after releasing the lock"""
+        return self.view().copy()
+
+    def latest(self):
+        """Most recent row as {channel: value}, or None when empty"""
+        if self.count == 0:
+            return None
+        row = self._data[self._head + self.capacity - 1]
+        return {name: float(row[i]) for i, name in enumerate(self.channels)}
@@ -0,0 +1,143 @@
+import multiprocessing as mp
+import numpy as np
+from core.batch import BatchPlantModel
+
+
+class VecPlantEnv:
+    """
+    N plants stepped in lockstep for RL data collection.
+    Each episode draws a random target and disturbance level per plant;
+    finished episodes are reset automatically after their transition is returned.
+    Observations match HybridController: [position, velocity, target, error].
+    """
+    def __init__(self, n_envs, dt=0.05, target_range=(-10.0, 10.0), noise_range=(0.0, 1.0),
+                 episode_steps=200, max_action=10.0, seed=None):
+        self.n_envs = n_envs
+        self.dt = dt
+        self.target_range = target_range
+        self.noise_range = noise_range
+        self.episode_steps = episode_steps
+        self.max_action = max_action
+
+        self.rng = np.random.default_rng(seed)
+        self.plant = BatchPlantModel(n_envs, seed=self.rng.integers(2**63))
+        self.targets = np.zeros(n_envs)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.states = np.zeros((n_envs, 4))
+        self.reset()
+
+    def reset(self):
+        self._reset_envs(np.ones(self.n_envs, dtype=bool))
+        return self.states
+
+    def _reset_envs(self, mask):
+        n = int(mask.sum())
+        self.plant.position[mask] = 0.0
+        self.plant.velocity[mask] = 0.0
+        self.plant.noise_level[mask] = self.rng.uniform(*self.noise_range, size=n)
+        self.targets[mask] = self.rng.uniform(*self.target_range, size=n)
+        self.steps[mask] = 0
+        self._observe(self.states)
+
+    def _observe(self, out):
+        out[:, 0] = self.plant.position
+        out[:, 1] = self.plant.velocity
+        out[:, 2] = self.targets
+        out[:, 3] = self.targets - self.plant.position
+        return out
+
+    def step(self, actions):
+        """
+        Apply one action per plant. Returns (next_states, rewards, dones) for the
+        transitions just taken; self.states then holds the post-reset observations.
+        Episode ends are time limits, so dones stays False (continuous task).
+        """
+        u = np.clip(np.reshape(actions, self.n_envs), -self.max_action, self.max_action)
+        error = self.targets - self.plant.position
+        # Same reward as HybridController: negative squared error + effort penalty
+        rewards = -(error**2 + 0.01 * u**2)
+
+        self.plant.update(u, self.dt)
+        next_states = self._observe(np.empty((self.n_envs, 4)))
+        dones = np.zeros(self.n_envs, dtype=bool)
+
+        self.steps += 1
+        finished = self.steps >= self.episode_steps
+        if finished.any():
+            self._reset_envs(finished)
+        else:
+            self.states[:] = next_states
+        return next_states, rewards, dones
+
+    def close(self):
+        pass
+
+
+def _worker(conn, kwargs):
+    env = VecPlantEnv(**kwargs)
+    while True:
+        cmd, data = conn.recv()
+        if cmd == "step":
+            conn.send(env.step(data) + (env.states.copy(),))
+        elif cmd == "reset":
+            conn.send(env.reset().copy())
+        elif cmd == "close":
+            conn.close()
+            break
+
+
+class SubprocVecEnv:
+    """VecPlantEnv batches spread across worker processes, with the same interface"""
+    def __init__(self, n_workers, envs_per_worker, seed=None, **env_kwargs):
+        ctx = mp.get_context("spawn")
+        seeds = np.random.SeedSequence(seed).spawn(n_workers)
+        self.n_envs = n_workers * envs_per_worker
+        self._splits = np.arange(envs_per_worker, self.n_envs, envs_per_worker)
+        self._conns = []
+        self._procs = []
+        for i in range(n_workers):
+            parent, child = ctx.Pipe()
+            kwargs = dict(env_kwargs, n_envs=envs_per_worker,
+                          seed=int(seeds[i].generate_state(1)[0]))
+            proc = ctx.Process(target=_worker, args=(child, kwargs), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        self.states = self.reset()
+
+    def reset(self):
+        for conn in self._conns:
+            conn.send(("reset", None))
+        self.states = np.concatenate([conn.recv() for conn in self._conns])
+        return self.states
+
+    def step(self, actions):
+        for conn, chunk in zip(self._conns, np.split(np.asarray(actions), self._splits)):
+            conn.send(("step", chunk))
+        results = [conn.recv() for conn in self._conns]
+        next_states, rewards, dones, states = (np.concatenate(parts) for parts in zip(*results))
+        self.states = states
+        return next_states, rewards, dones
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(("close", None))
+        for proc in self._procs:
+            proc.join(timeout=1.0)
+
+
+def collect(agent, env, steps, noise=0.2):
+    """
+    Run `steps` lockstep steps of a vectorized env with one batched actor
+    forward pass per step, pushing env.n_envs transitions into the replay buffer
+    each time. Returns the mean reward.
+    """
+    total = 0.0
+    for _ in range(steps):
+        states = env.states.copy()
+        actions = agent.select_actions(states, noise)
+        next_states, rewards, dones = env.step(actions)
+        agent.replay_buffer.add_batch(states, actions, rewards, next_states, dones)
+        total += rewards.mean()
+    return total / steps
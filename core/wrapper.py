@@ -1,55 +1,268 @@
 import ctypes
 import os
 import sys
+import numpy as np
 
-# Load the DLL
-dll_path = os.path.join(os.path.dirname(__file__), 'native', 'controller.dll')
-if not os.path.exists(dll_path):
-    raise FileNotFoundError(f"Controller DLL not found at {dll_path}. Please run compile_native.bat first.")
+# Native library name per platform (built with `make -C core/native`)
+if sys.platform == "win32":
+    LIB_NAME = "controller.dll"
+elif sys.platform == "darwin":
+    LIB_NAME = "controller.dylib"
+else:
+    LIB_NAME = "controller.so"
 
-try:
-    _lib = ctypes.CDLL(dll_path)
-except OSError as e:
-    print(f"Error loading DLL: {e}")
-    sys.exit(1)
+lib_path = os.path.join(os.path.dirname(__file__), 'native', LIB_NAME)
 
-# Define argument and return types
-_lib.init_system.argtypes = []
-_lib.init_system.restype = None
+# Load the library; without it the pure-Python HybridController is used instead
+# ctypes.CDLL (unlike PyDLL) releases the GIL for the duration of every call,
+# so independent controllers can be stepped from a thread pool in parallel.
+_lib = None
+NATIVE_AVAILABLE = False
+if os.path.exists(lib_path):
+    try:
+        _lib = ctypes.CDLL(lib_path)
+        NATIVE_AVAILABLE = True
+    except OSError as e:
+        print(f"[NATIVE] Error loading {lib_path}: {e}")
+else:
+    print(f"[NATIVE] {LIB_NAME} not found in core/native (run `make -C core/native`); "
+          "using the Python controller")
 
-_lib.set_pid_params.argtypes = [ctypes.c_double, ctypes.c_double, ctypes.c_double]
-_lib.set_pid_params.restype = None
+if NATIVE_AVAILABLE and not hasattr(_lib, "ctrl_create"):
+    print(f"[NATIVE] {LIB_NAME} predates the handle API; rebuild it with `make -C core/native`")
+    _lib = None
+    NATIVE_AVAILABLE = False
 
-_lib.get_position.argtypes = []
-_lib.get_position.restype = ctypes.c_double
+if NATIVE_AVAILABLE:
+    # Define argument and return types
+    _handle = ctypes.c_void_p
+    _in_array = np.ctypeslib.ndpointer(dtype=np.float64, flags="C_CONTIGUOUS")
+    _out_array = np.ctypeslib.ndpointer(dtype=np.float64, flags=("C_CONTIGUOUS", "WRITEABLE"))
 
-_lib.step_system.argtypes = [
-    ctypes.c_double, # target
-    ctypes.c_double, # dt
-    ctypes.POINTER(ctypes.c_double), # out_pos
-    ctypes.POINTER(ctypes.c_double), # out_u
-    ctypes.POINTER(ctypes.c_double)  # out_alpha
-]
-_lib.step_system.restype = None
+    _lib.ctrl_create.argtypes = []
+    _lib.ctrl_create.restype = _handle
+
+    _lib.ctrl_destroy.argtypes = [_handle]
+    _lib.ctrl_destroy.restype = None
+
+    _lib.ctrl_reset.argtypes = [_handle]
+    _lib.ctrl_reset.restype = None
+
+    _lib.ctrl_set_pid_params.argtypes = [_handle, ctypes.c_double, ctypes.c_double, ctypes.c_double]
+    _lib.ctrl_set_pid_params.restype = None
+
+    _lib.ctrl_get_position.argtypes = [_handle]
+    _lib.ctrl_get_position.restype = ctypes.c_double
+
+    _lib.ctrl_set_mpc_table.argtypes = [_handle, _in_array, ctypes.c_int]
+    _lib.ctrl_set_mpc_table.restype = ctypes.c_int
+
+    _lib.ctrl_clear_mpc_table.argtypes = [_handle]
+    _lib.ctrl_clear_mpc_table.restype = None
+
+    _lib.ctrl_load_policy.argtypes = [_handle, _in_array, ctypes.c_int]
+    _lib.ctrl_load_policy.restype = ctypes.c_int
+
+    _lib.ctrl_clear_policy.argtypes = [_handle]
+    _lib.ctrl_clear_policy.restype = None
+
+    _lib.ctrl_set_mode.argtypes = [_handle, ctypes.c_int]
+    _lib.ctrl_set_mode.restype = ctypes.c_int
+
+    _lib.ctrl_policy_action.argtypes = [_handle, _in_array, _out_array]
+    _lib.ctrl_policy_action.restype = ctypes.c_int
+
+    _lib.ctrl_step.argtypes = [
+        _handle,
+        ctypes.c_double, # target
+        ctypes.c_double, # dt
+        ctypes.POINTER(ctypes.c_double), # out_pos
+        ctypes.POINTER(ctypes.c_double), # out_u
+        ctypes.POINTER(ctypes.c_double)  # out_alpha
+    ]
+    _lib.ctrl_step.restype = None
+
+    _lib.ctrl_step_many.argtypes = [
+        _handle,
+        _in_array,          # targets
+        ctypes.c_longlong,  # n
+        ctypes.c_double,    # dt
+        _out_array,         # out_pos
+        _out_array,         # out_u
+        _out_array          # out_alpha
+    ]
+    _lib.ctrl_step_many.restype = None
+
+    _lib.mpc_batch.argtypes = [
+        _in_array,          # pos
+        _in_array,          # vel
+        _in_array,          # target
+        ctypes.c_longlong,  # n
+        ctypes.c_double,    # dt
+        _out_array,         # out_u
+        ctypes.c_int        # n_threads
+    ]
+    _lib.mpc_batch.restype = None
+
+# Control modes understood by ctrl_set_mode (RL_TRAIN needs torch, so it has no native mode)
+NATIVE_MODES = {"HYBRID": 0, "RL_INFERENCE": 1}
 
 class NativeController:
+    """
+    One native controller instance with its own state, gains and MPC table.
+    Instances are independent, and calls run without the GIL, so separate
+    instances may be stepped concurrently from different threads (a single
+    instance must not be shared between threads).
+    """
     def __init__(self):
-        self.init_system()
-        
+        if not NATIVE_AVAILABLE:
+            raise RuntimeError(f"Native controller library not available at {lib_path}")
+        self._handle = _lib.ctrl_create()
+        if not self._handle:
+            raise MemoryError("ctrl_create failed")
+        # Output slots reused by every step() call
+        self._out_pos = ctypes.c_double()
+        self._out_u = ctypes.c_double()
+        self._out_alpha = ctypes.c_double()
+        self._out_refs = (ctypes.byref(self._out_pos), ctypes.byref(self._out_u),
+                          ctypes.byref(self._out_alpha))
+        self._policy_shape = None
+
+    def close(self):
+        """Free the native instance (also done on garbage collection)"""
+        if self._handle:
+            _lib.ctrl_destroy(self._handle)
+            self._handle = None
+
+    def __del__(self):
+        if getattr(self, "_handle", None) and _lib is not None:
+            self.close()
+
     def init_system(self):
-        _lib.init_system()
-        
+        _lib.ctrl_reset(self._handle)
+
+    def reset(self):
+        self.init_system()
+
     def set_pid_params(self, kp, ki, kd):
-        _lib.set_pid_params(kp, ki, kd)
-        
+        _lib.ctrl_set_pid_params(self._handle, kp, ki, kd)
+
+    def set_pid_gains(self, kp, ki, kd):
+        """Same name as HybridController.set_pid_gains"""
+        self.set_pid_params(kp, ki, kd)
+
     def get_position(self):
-        return _lib.get_position()
-        
+        return _lib.ctrl_get_position(self._handle)
+
+    def load_mpc_table(self, path):
+        """
+        Use an exported explicit MPC table in place of the native grid search.
+        The table replaces the MPC as-is: build it with
+        ExplicitMPCTable.build_native(dt) (same model as compute_mpc, for the
+        dt passed to step) to keep the controller's behaviour. A table from
+        MPCController.export_table solves the Python MPC's model instead
+        (damping 0.5, dt 0.1, different cost weights).
+        """
+        blob = np.ascontiguousarray(np.fromfile(path, dtype=np.float64))
+        if _lib.ctrl_set_mpc_table(self._handle, blob, blob.size) != 0:
+            raise ValueError(f"Malformed MPC table: {path}")
+
+    def clear_mpc_table(self):
+        _lib.ctrl_clear_mpc_table(self._handle)
+
+    def load_policy(self, policy):
+        """
+        Load DDPG actor weights: a DDPGAgent, an actor_blob() array or a file
+        written by DDPGAgent.export_actor. Used in RL_INFERENCE mode.
+        """
+        if hasattr(policy, "actor_blob"):
+            blob = policy.actor_blob()
+        elif isinstance(policy, np.ndarray):
+            blob = policy
+        else:
+            blob = np.fromfile(policy, dtype=np.float64)
+        blob = np.ascontiguousarray(blob, dtype=np.float64)
+        if _lib.ctrl_load_policy(self._handle, blob, blob.size) != 0:
+            raise ValueError("Malformed policy blob")
+        self._policy_shape = (int(blob[0]), int(blob[3]))
+
+    def clear_policy(self):
+        """Drop the loaded policy (switches back to HYBRID)"""
+        _lib.ctrl_clear_policy(self._handle)
+        self._policy_shape = None
+
+    def set_mode(self, mode):
+        """HYBRID or RL_INFERENCE (requires load_policy first)"""
+        if mode not in NATIVE_MODES:
+            raise ValueError(f"Mode '{mode}' is not supported natively, expected one of {sorted(NATIVE_MODES)}")
+        if _lib.ctrl_set_mode(self._handle, NATIVE_MODES[mode]) != 0:
+            raise RuntimeError(f"{mode} needs a loaded 4-input, 1-output policy (call load_policy)")
+
+    def policy_action(self, state):
+        """Evaluate the loaded policy natively on one state"""
+        if self._policy_shape is None:
+            raise RuntimeError("No policy loaded")
+        state = np.ascontiguousarray(state, dtype=np.float64).ravel()
+        if state.size != self._policy_shape[0]:
+            raise ValueError(f"Expected {self._policy_shape[0]} state values, got {state.size}")
+        out = np.empty(self._policy_shape[1])
+        _lib.ctrl_policy_action(self._handle, state, out)
+        return out
+
     def step(self, target, dt):
-        out_pos = ctypes.c_double()
-        out_u = ctypes.c_double()
-        out_alpha = ctypes.c_double()
-        
-        _lib.step_system(target, dt, ctypes.byref(out_pos), ctypes.byref(out_u), ctypes.byref(out_alpha))
-        
-        return out_pos.value, out_u.value, out_alpha.value
+        _lib.ctrl_step(self._handle, target, dt, *self._out_refs)
+        return self._out_pos.value, self._out_u.value, self._out_alpha.value
+
+    def step_many(self, targets, dt, out_pos=None, out_u=None, out_alpha=None):
+        """
+        Run len(targets) steps in one native call.
+        Trajectories are written into the given float64 buffers (allocated if None)
+        through their raw pointers; returns (out_pos, out_u, out_alpha).
+        """
+        targets = np.ascontiguousarray(targets, dtype=np.float64).ravel()
+        n = targets.size
+        out_pos = _output_buffer(out_pos, n)
+        out_u = _output_buffer(out_u, n)
+        out_alpha = _output_buffer(out_alpha, n)
+
+        _lib.ctrl_step_many(self._handle, targets, n, dt, out_pos, out_u, out_alpha)
+        return out_pos, out_u, out_alpha
+
+
+def mpc_batch(positions, velocities, targets, dt, out=None, n_threads=0):
+    """
+    Native grid-search MPC for many plants at once (same model as the native
+    controller's MPC without a loaded table, see mpc_table.native_grid_search).
+    Inputs broadcast to a common 1-D shape; returns u per plant.
+    n_threads only matters for libraries built with OPENMP=1 (0 = OpenMP default).
+    """
+    if not NATIVE_AVAILABLE:
+        raise RuntimeError(f"Native controller library not available at {lib_path}")
+    positions, velocities, targets = (
+        np.ascontiguousarray(a, dtype=np.float64).ravel()
+        for a in np.broadcast_arrays(positions, velocities, targets))
+    n = positions.size
+    out = _output_buffer(out, n)
+    _lib.mpc_batch(positions, velocities, targets, n, dt, out, n_threads)
+    return out
+
+
+def _output_buffer(buf, n):
+    if buf is None:
+        return np.empty(n)
+    if buf.dtype != np.float64 or not buf.flags.c_contiguous or not buf.flags.writeable:
+        raise ValueError("Output buffers must be writeable, C-contiguous float64 arrays")
+    if buf.size < n:
+        raise ValueError(f"Output buffer holds {buf.size} values, need {n}")
+    return buf
+
+
+def create_controller(prefer_native=True):
+    """
+    NativeController when the library loaded, otherwise HybridController.
+    Both step(target, dt) results start with (position, u, alpha).
+    """
+    if prefer_native and NATIVE_AVAILABLE:
+        return NativeController()
+    from core.controller import HybridController
+    return HybridController()
@@ -2,11 +2,11 @@ import customtkinter as ctk
 import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
-import matplotlib.animation as animation
-from mpl_toolkits.mplot3d import Axes3D
 import time
 import numpy as np
 from core.simulation import SimulationRunner
+from gui.blit import BlitManager, RangeWindow, ScrollWindow
+from gui.decimate import MinMaxDecimator, StrideSampler, pixel_stride
 import webbrowser
 import sys
 import datetime
@@ -25,6 +25,19 @@ COLOR_DANGER = "#ff3838"    # Bright Red
 COLOR_GRID = "#2a2a2a"      # Subtle Grid
 COLOR_WARNING = "#ffb302"   # Amber
 
+# Plot refresh period: focused, unfocused, minimized (no drawing, just polling)
+FRAME_INTERVAL_MS = 50
+UNFOCUSED_INTERVAL_MS = 250
+MINIMIZED_INTERVAL_MS = 500
+
+# Telemetry channels each tab plots
+TAB_CHANNELS = {
+    "DASHBOARD": ("time", "target", "position", "control", "alpha"),
+    "ANALYSIS": ("time", "position", "velocity", "error"),
+    "PID DETAILS": ("time", "p_term", "i_term", "d_term"),
+    "AI TRAINING": ("time", "loss"),
+}
+
 class SettingsWindow(ctk.CTkToplevel):
     def __init__(self, master, app_instance):
         super().__init__(master)
@@ -254,7 +267,21 @@ class MainDashboardFrame(ctk.CTkFrame):
         
         # Setup Animation
         self.setup_plots()
-        self.ani = animation.FuncAnimation(self.fig, self.update_plot, interval=50, blit=False, cache_frame_data=False)
+        self.after(FRAME_INTERVAL_MS, self.animate)
+
+    def animate(self):
+        try:
+            self.update_plot()
+        finally:
+            self.after(self.frame_interval(), self.animate)
+
+    def frame_interval(self):
+        """Throttle rendering when the window is minimized or in the background"""
+        if self.app.state() == "iconic":
+            return MINIMIZED_INTERVAL_MS
+        if self.app.focus_displayof() is None:
+            return UNFOCUSED_INTERVAL_MS
+        return FRAME_INTERVAL_MS
 
     def create_sidebar(self):
         self.sidebar_frame = ctk.CTkFrame(self, width=260, corner_radius=0, fg_color=COLOR_PANEL)
@@ -388,7 +415,8 @@ class MainDashboardFrame(ctk.CTkFrame):
                                      segmented_button_unselected_color="#222222",
                                      segmented_button_unselected_hover_color="#333333",
                                      text_color="#ffffff",
-                                     height=40)
+                                     height=40,
+                                     command=self.on_tab_change)
         self.tab_view.grid(row=1, column=0, sticky="nsew")
         
         self.tab_main = self.tab_view.add("DASHBOARD")
@@ -471,6 +499,7 @@ class MainDashboardFrame(ctk.CTkFrame):
         self.ax_fft.set_title("FREQ SPECTRUM", color="#888888", fontsize=8)
         self.bar_fft = self.ax_fft.bar(range(10), np.random.rand(10), color=COLOR_ACCENT_2, alpha=0.6)
         self.ax_fft.axis('off')
+        self.ax_fft.set_ylim(0, 1.05) # Spectrum is normalized to its peak
 
         self.fig2.subplots_adjust(wspace=0.3, hspace=0.4, left=0.08, right=0.95, top=0.90, bottom=0.1)
         
@@ -506,8 +535,62 @@ class MainDashboardFrame(ctk.CTkFrame):
         
         self.canvas3 = self.card_pid.canvas
         
-        # --- Tab 4: AI & 3D Landscape ---
-        self.fig4 = Figure(figsize=(6, 4), dpi=100, **style)
+        # --- Tab 4: AI & 3D Landscape (built on first visit, see setup_ai_tab) ---
+        self.card_ai = None
+
+        # Initial Styling
+        self.apply_plot_styles([self.ax1, self.ax2, self.ax_phase, self.ax_error, self.ax_pid])
+        self.ax2_twin.set_ylim(0, 1.1)
+        self.ax2_twin.spines['right'].set_color(COLOR_ACCENT)
+        self.ax2_twin.tick_params(axis='y', colors=COLOR_ACCENT)
+        
+        # Modernize Cards
+        self.card_sys.configure(border_color=COLOR_ACCENT, border_width=1)
+        self.card_ctrl.configure(border_color=COLOR_WARNING, border_width=1)
+        self.card_analysis.configure(border_color=COLOR_SUCCESS, border_width=1)
+        self.card_pid.configure(border_color="#ffd740", border_width=1)
+        self.ax2.set_ylim(-11, 11)
+        
+        # Blitting: frames redraw only these artists over cached backgrounds
+        self.blit_sys = BlitManager(self.canvas, [self.line_target, self.line_pos, self.line_pred])
+        self.blit_ctrl = BlitManager(self.card_ctrl.canvas, [self.line_control, self.line_alpha])
+        self.blit_analysis = BlitManager(self.canvas2, [self.line_phase, self.point_phase, self.line_error,
+                                                        self.line_radar, self.fill_radar[0], *self.bar_fft])
+        self.blit_pid = BlitManager(self.canvas3, [self.line_p, self.line_i, self.line_d])
+        
+        # Axis limits move only when data leaves the view. Time axes span the
+        # whole history (+1 s for the MPC prediction), however long it is.
+        self.plot_span = self.runner.max_points * self.runner.dt + 1.0
+        self.time_window = ScrollWindow(width=self.plot_span, headroom=0.2) # Shared by all time axes
+        self.range_pos = RangeWindow(min_span=2.0)
+        self.range_phase_x = RangeWindow()
+        self.range_phase_y = RangeWindow()
+        self.range_error = RangeWindow()
+        self.range_pid = RangeWindow()
+        
+        # Min/max decimation per time-series line (see set_decimated), fed only
+        # the rows each one has not seen yet; the phase plane is sampled instead
+        self.decimators = {}
+        self.phase_sampler = StrideSampler()
+        self.tab_lines = {
+            "DASHBOARD": [self.line_target, self.line_pos, self.line_control, self.line_alpha],
+            "ANALYSIS": [self.line_error],
+            "PID DETAILS": [self.line_p, self.line_i, self.line_d],
+            "AI TRAINING": [],
+        }
+        
+        # Render scheduling: sample_count each tab (and the cards) last showed
+        self.rendered_count = {}
+        self.cards_count = None
+
+    def setup_ai_tab(self):
+        """Build the AI tab (loss plot + 3D landscape) the first time it is needed"""
+        if self.card_ai is not None:
+            return
+        # Registers the '3d' projection; deferred so startup skips mplot3d
+        from mpl_toolkits.mplot3d import Axes3D
+
+        self.fig4 = Figure(figsize=(6, 4), dpi=100, facecolor=COLOR_PANEL, edgecolor='none', linewidth=0)
         self.ax_loss = self.fig4.add_subplot(121)
         self.ax_3d = self.fig4.add_subplot(122, projection='3d')
         self.fig4.subplots_adjust(left=0.05, right=0.95, top=0.95, bottom=0.15, wspace=0.3)
@@ -533,18 +616,51 @@ class MainDashboardFrame(ctk.CTkFrame):
         self.card_ai.configure(border_color=COLOR_ACCENT_2, border_width=2) # Neon Pink Border
         
         self.canvas4 = self.card_ai.canvas
-
-        # Initial Styling
-        self.apply_plot_styles([self.ax1, self.ax2, self.ax_phase, self.ax_error, self.ax_pid, self.ax_loss])
-        self.ax2_twin.set_ylim(0, 1.1)
-        self.ax2_twin.spines['right'].set_color(COLOR_ACCENT)
-        self.ax2_twin.tick_params(axis='y', colors=COLOR_ACCENT)
-        
-        # Modernize Cards
-        self.card_sys.configure(border_color=COLOR_ACCENT, border_width=1)
-        self.card_ctrl.configure(border_color=COLOR_WARNING, border_width=1)
-        self.card_analysis.configure(border_color=COLOR_SUCCESS, border_width=1)
-        self.card_pid.configure(border_color="#ffd740", border_width=1)
+        self.apply_plot_styles([self.ax_loss])
+        self.tab_lines["AI TRAINING"] = [self.line_loss]
+
+    def on_tab_change(self):
+        tab = self.tab_view.get()
+        if tab == "AI TRAINING":
+            self.setup_ai_tab()
+        # Limits may have moved while the tab was hidden
+        self.rendered_count.pop(tab, None)
+
+    def tab_consumers(self, tab):
+        """Decimators (and the phase sampler) of a tab, with strides for the current axes sizes"""
+        consumers = []
+        for line in self.tab_lines[tab]:
+            decimator = self.decimators.get(line)
+            if decimator is None:
+                decimator = self.decimators[line] = MinMaxDecimator()
+            decimator.set_stride(pixel_stride(self.plot_span / self.runner.dt, line.axes.bbox.width))
+            consumers.append(decimator)
+        if tab == "ANALYSIS":
+            self.phase_sampler.set_stride(pixel_stride(self.runner.max_points, self.ax_phase.bbox.width))
+            consumers.append(self.phase_sampler)
+        return consumers
+
+    def set_decimated(self, line, x, y, oldest, end):
+        """
+        set_data with ~2 points per horizontal pixel of the line's axes.
+        x, y are the new samples up to absolute index end (see snapshot_since);
+        returns the decimated y (same min/max as the history) for range fitting.
+        """
+        x, y = self.decimators[line](x, y, end, oldest)
+        line.set_data(x, y)
+        return y
+
+    def sync_limits(self, ax, blitter, xlim=None, ylim=None):
+        """Apply window limits to an axes; a change invalidates the cached background"""
+        changed = False
+        if xlim is not None and ax.get_xlim() != xlim:
+            ax.set_xlim(xlim)
+            changed = True
+        if ylim is not None and ax.get_ylim() != ylim:
+            ax.set_ylim(ylim)
+            changed = True
+        if changed:
+            blitter.invalidate()
 
     def apply_plot_styles(self, axes):
         for ax in axes:
@@ -589,69 +705,95 @@ class MainDashboardFrame(ctk.CTkFrame):
         self.runner.reset()
         # Reset lines
         for line in [self.line_target, self.line_pos, self.line_pred, self.line_control, self.line_alpha, 
-                     self.line_phase, self.line_error, self.line_p, self.line_i, self.line_d, self.line_loss]:
+                     self.line_phase, self.line_error, self.line_p, self.line_i, self.line_d]:
             line.set_data([], [])
         self.point_phase.set_data([], [])
-        
+        for decimator in self.decimators.values():
+            decimator.reset()
+        self.phase_sampler.reset()
+        self.rendered_count.clear()
+        self.cards_count = None
+        
+        for window in (self.time_window, self.range_pos, self.range_phase_x, self.range_phase_y,
+                       self.range_error, self.range_pid):
+            window.reset()
         self.canvas.draw()
+        self.card_ctrl.canvas.draw()
         self.canvas2.draw()
         self.canvas3.draw()
-        self.canvas4.draw()
+        if self.card_ai is not None:
+            self.line_loss.set_data([], [])
+            self.canvas4.draw()
 
-    def update_plot(self, frame):
-        if not self.runner.running:
+    def update_plot(self):
+        # Nothing to show while stopped or minimized
+        if not self.runner.running or self.app.state() == "iconic":
             return
 
-        # Fetch latest data snapshot from runner
-        data = self.runner.get_history()
-        metrics = self.runner.get_latest_metrics()
-        radar_metrics = self.runner.get_radar_metrics()
-        fft_data = self.runner.get_fft_data()
-        
-        # Unpack data
-        times = data["time"]
-        targets = data["target"]
-        positions = data["position"]
-        velocities = data["velocity"]
-        controls = data["control"]
-        alphas = data["alpha"]
-        errors = data["error"]
-        p_terms = data["p_term"]
-        i_terms = data["i_term"]
-        d_terms = data["d_term"]
-        losses = data["loss"]
-        
-        if not times:
+        # Render only when new samples arrived, or the active tab was invalidated
+        active_tab = self.tab_view.get()
+        count = self.runner.sample_count
+        if count == 0 or self.rendered_count.get(active_tab) == count:
+            return
+
+        latest = self.runner.latest_sample()
+        if latest is None:
             return
 
-        # Define current_time globally for all tabs
-        current_time = times[-1]
-        
         # --- VERBOSE LOGGING (System Logs) ---
         # Print key metrics to stdout (redirected to terminal)
         # We limit frequency to avoid spamming (every 10th frame approx)
+        current_time = latest["time"]
         if self.app.verbose_logging and int(current_time * 10) % 10 == 0:
-            print(f"[SIM] T={current_time:.2f} | POS={positions[-1]:.2f} | TGT={targets[-1]:.2f} | ERR={errors[-1]:.4f}")
-            print(f"      PID: P={p_terms[-1]:.2f} I={i_terms[-1]:.2f} D={d_terms[-1]:.2f} | U={controls[-1]:.2f}")
+            print(f"[SIM] T={current_time:.2f} | POS={latest['position']:.2f} | TGT={latest['target']:.2f} | ERR={latest['error']:.4f}")
+            print(f"      PID: P={latest['p_term']:.2f} I={latest['i_term']:.2f} D={latest['d_term']:.2f} | U={latest['control']:.2f}")
 
         # Update Cards
-        for k, v in metrics.items():
-            if k in self.metric_cards:
-                self.metric_cards[k].update_value(v)
+        if self.cards_count != count:
+            self.cards_count = count
+            for k, v in self.runner.get_latest_metrics().items():
+                if k in self.metric_cards:
+                    self.metric_cards[k].update_value(v)
+
+        # Fetch only the channels the active tab plots, and only the rows its
+        # decimators have not consumed yet (the lock is held for just that copy)
+        if active_tab == "AI TRAINING":
+            self.setup_ai_tab()
+        consumers = self.tab_consumers(active_tab)
+        since = min(consumer.end for consumer in consumers)
+        oldest, end, data = self.runner.snapshot_since(since, TAB_CHANNELS[active_tab])
+        self.rendered_count[active_tab] = end
+        
+        # Unpack the new rows (channels not fetched for this tab are None)
+        times = data["time"]
+        targets = data.get("target")
+        positions = data.get("position")
+        velocities = data.get("velocity")
+        controls = data.get("control")
+        alphas = data.get("alpha")
+        errors = data.get("error")
+        p_terms = data.get("p_term")
+        i_terms = data.get("i_term")
+        d_terms = data.get("d_term")
+        losses = data.get("loss")
 
-        # Selective Rendering
-        active_tab = self.tab_view.get()
-        
+        # Define current_time globally for all tabs
+        current_time = latest["time"]
+        # +1 s keeps the MPC prediction in view
+        self.time_window.update(current_time + 1.0)
+        time_limits = self.time_window.limits
+
+        # Selective Rendering: analytics are computed for the visible tab only
         if active_tab == "DASHBOARD":
-            self.line_target.set_data(times, targets)
-            self.line_pos.set_data(times, positions)
-            self.line_control.set_data(times, controls)
-            self.line_alpha.set_data(times, alphas)
+            shown_targets = self.set_decimated(self.line_target, times, targets, oldest, end)
+            shown_positions = self.set_decimated(self.line_pos, times, positions, oldest, end)
+            self.set_decimated(self.line_control, times, controls, oldest, end)
+            self.set_decimated(self.line_alpha, times, alphas, oldest, end)
             
             # MPC Prediction (Ghost Line)
-            pos = positions[-1]
-            vel = velocities[-1]
-            u = controls[-1]
+            pos = latest["position"]
+            vel = latest["velocity"]
+            u = latest["control"]
             
             pred_t = np.linspace(current_time, current_time + 1.0, 10)
             pred_pos = [pos]
@@ -663,20 +805,24 @@ class MainDashboardFrame(ctk.CTkFrame):
                 pred_pos.append(p)
             self.line_pred.set_data(pred_t, pred_pos)
 
-            self.ax1.set_xlim(max(0, current_time - 10), current_time + 1)
-            self.ax1.set_ylim(min(min(positions), min(targets)) - 1, max(max(positions), max(targets)) + 1)
-            self.ax2.set_xlim(max(0, current_time - 10), current_time + 1)
-            self.ax2.set_ylim(-11, 11)
+            self.range_pos.update(shown_positions, shown_targets)
+            self.sync_limits(self.ax1, self.blit_sys, time_limits, self.range_pos.limits)
+            self.sync_limits(self.ax2, self.blit_ctrl, time_limits)
             
-            self.canvas.draw_idle()
-            self.card_ctrl.canvas.draw_idle() # Explicitly draw the second canvas
+            self.blit_sys.update()
+            self.blit_ctrl.update()
 
         elif active_tab == "ANALYSIS":
-            self.line_phase.set_data(positions, velocities)
-            self.point_phase.set_data([positions[-1]], [velocities[-1]])
-            self.line_error.set_data(times, errors)
+            radar_metrics = self.runner.get_radar_metrics()
+            fft_data = self.runner.get_fft_data()
+            
+            # Phase plane: every k-th sample (aligned to the absolute index), since
+            # a min/max reduction along one axis would distort the trajectory
+            shown_positions, shown_velocities = self.phase_sampler((positions, velocities), end, oldest)
+            self.line_phase.set_data(shown_positions, shown_velocities)
+            self.point_phase.set_data([latest["position"]], [latest["velocity"]])
+            shown_errors = self.set_decimated(self.line_error, times, errors, oldest, end)
             
-            # Update Radar Chart
             # Update Radar Chart
             categories = ['Stability', 'Response', 'Accuracy', 'Efficiency', 'Robustness']
             N = len(categories)
@@ -687,43 +833,34 @@ class MainDashboardFrame(ctk.CTkFrame):
             self.line_radar.set_data(angles, radar_metrics_closed)
             
             # Update Radar Fill (Vertices)
-            # The fill is a Polygon. We can update its vertices (xy).
-            # xy is a (N, 2) array of (theta, radius) converted to cartesian? 
-            # Matplotlib polar fill uses cartesian coords internally for the Polygon?
-            # Actually, for polar axes, set_xy expects (theta, radius) if it's a specialized patch?
-            # No, Polygon usually expects x,y. Polar projection handles the transform.
-            # Let's try removing and adding a new fill for simplicity and reliability.
-            if hasattr(self, 'fill_radar'):
-                try:
-                    self.fill_radar[0].remove()
-                except: pass
-            self.fill_radar = self.ax_radar.fill(angles, radar_metrics_closed, color=COLOR_ACCENT, alpha=0.25)
+            # The fill is a Polygon in data coordinates (theta, radius); the polar
+            # transform maps it, so the vertices can be replaced in place.
+            self.fill_radar[0].set_xy(np.column_stack([angles, radar_metrics_closed]))
             
             # Update FFT Bar Chart
             for rect, h in zip(self.bar_fft, fft_data):
                 rect.set_height(h)
             
-            self.ax_phase.relim()
-            self.ax_phase.autoscale_view()
-            self.ax_error.set_xlim(max(0, current_time - 10), current_time + 1)
-            self.ax_error.set_ylim(min(errors)-0.5, max(errors)+0.5)
+            self.range_phase_x.update(shown_positions, [latest["position"]])
+            self.range_phase_y.update(shown_velocities, [latest["velocity"]])
+            self.range_error.update(shown_errors)
+            self.sync_limits(self.ax_phase, self.blit_analysis, self.range_phase_x.limits, self.range_phase_y.limits)
+            self.sync_limits(self.ax_error, self.blit_analysis, time_limits, self.range_error.limits)
             
-            self.canvas2.draw_idle()
+            self.blit_analysis.update()
 
         elif active_tab == "PID DETAILS":
-            self.line_p.set_data(times, p_terms)
-            self.line_i.set_data(times, i_terms)
-            self.line_d.set_data(times, d_terms)
-            
-            self.ax_pid.set_xlim(max(0, current_time - 10), current_time + 1)
-            self.ax_pid.relim()
-            self.ax_pid.autoscale_view()
+            self.range_pid.update(self.set_decimated(self.line_p, times, p_terms, oldest, end),
+                                  self.set_decimated(self.line_i, times, i_terms, oldest, end),
+                                  self.set_decimated(self.line_d, times, d_terms, oldest, end))
+            self.sync_limits(self.ax_pid, self.blit_pid, time_limits, self.range_pid.limits)
             
-            self.canvas3.draw_idle()
+            self.blit_pid.update()
             
         elif active_tab == "AI TRAINING":
-            self.line_loss.set_data(times, losses)
-            self.ax_loss.set_xlim(max(0, current_time - 10), current_time + 1)
+            self.set_decimated(self.line_loss, times, losses, oldest, end)
+            # The rotating 3D view changes every frame, so this tab still draws in full
+            self.ax_loss.set_xlim(time_limits)
             self.ax_loss.relim()
             self.ax_loss.autoscale_view()
             
@@ -0,0 +1,109 @@
+import numpy as np
+
+
+class BlitManager:
+    """
+    Redraws only a canvas's animated artists over a cached background.
+    The artists are marked animated, so full draws render everything else;
+    the background is captured on every draw_event (first show, resize,
+    limit changes) and each frame afterwards is restore + draw_artist + blit.
+    """
+    def __init__(self, canvas, artists=()):
+        self.canvas = canvas
+        self.artists = []
+        self._background = None
+        for artist in artists:
+            self.add_artist(artist)
+        self._cid = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self.artists.append(artist)
+
+    def remove_artist(self, artist):
+        self.artists.remove(artist)
+
+    def invalidate(self):
+        """Background is stale (limits, ticks or size changed); next update redraws fully"""
+        self._background = None
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            figure.draw_artist(artist)
+
+    def update(self):
+        if self._background is None:
+            # Full render; _on_draw recaptures the background and draws the artists
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
+class ScrollWindow:
+    """
+    Time-axis limits of fixed width that only move when the newest sample
+    runs past the right edge; they then jump ahead by `headroom` of the width,
+    so the background is re-rendered once per jump instead of every frame.
+    """
+    def __init__(self, width, headroom=0.2, lower_bound=0.0):
+        self.width = width
+        self.headroom = headroom
+        self.lower_bound = lower_bound
+        self.reset()
+
+    def reset(self):
+        self.limits = (self.lower_bound, self.lower_bound + self.width)
+
+    def update(self, t):
+        """Returns True if the limits changed"""
+        lo, hi = self.limits
+        if lo <= t <= hi:
+            return False
+        hi = t + self.headroom * self.width
+        lo = max(self.lower_bound, hi - self.width)
+        self.limits = (lo, lo + self.width)
+        return True
+
+
+class RangeWindow:
+    """
+    Value-axis limits with hysteresis: they grow as soon as data leaves the
+    view (padded by `pad` of the data span) and shrink only once the data
+    covers less than `shrink` of the view.
+    """
+    def __init__(self, pad=0.1, shrink=0.4, min_span=1.0):
+        self.pad = pad
+        self.shrink = shrink
+        self.min_span = min_span
+        self.reset()
+
+    def reset(self):
+        self.limits = None
+
+    def update(self, *arrays):
+        """Fit the min/max of the given arrays; returns True if the limits changed"""
+        data_lo = min(float(np.min(a)) for a in arrays)
+        data_hi = max(float(np.max(a)) for a in arrays)
+        if not (np.isfinite(data_lo) and np.isfinite(data_hi)):
+            return False
+
+        if self.limits is not None:
+            lo, hi = self.limits
+            inside = lo <= data_lo and data_hi <= hi
+            if inside and (data_hi - data_lo) >= self.shrink * (hi - lo):
+                return False
+            if inside and hi - lo <= self.min_span * (1 + 2 * self.pad) * (1 + 1e-9):
+                return False
+
+        span = max(data_hi - data_lo, self.min_span)
+        center = 0.5 * (data_lo + data_hi)
+        half = 0.5 * span * (1 + 2 * self.pad)
+        self.limits = (center - half, center + half)
+        return True
@@ -0,0 +1,149 @@
+import numpy as np
+
+
+def pixel_stride(samples, pixels):
+    """Samples per bucket for ~2 points (min + max) per horizontal pixel"""
+    return max(1, int(np.ceil(samples / max(pixels, 1.0))))
+
+
+def _group_starts(i, s):
+    """Start offsets of the runs of equal bucket number i // s"""
+    buckets = i // s
+    return np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+
+
+class MinMaxDecimator:
+    """
+    Reduces one channel to the min and max of every `stride` samples, so
+    spikes survive at any zoom. Buckets are aligned to the absolute sample
+    index (SimulationRunner.sample_count), and the decimator is fed only the
+    samples after `end` (SimulationRunner.snapshot_since): completed buckets
+    are reduced once and cached, the bucket still filling is kept raw, and
+    buckets that scrolled out of the history are dropped. Work per call is
+    bounded by the new samples plus ~2 points per cached bucket.
+    """
+    def __init__(self, stride=1):
+        self.stride = stride
+        self.reset()
+
+    def reset(self):
+        self.end = 0 # Absolute index one past the last consumed sample
+        # Reduced points of completed buckets, with their absolute indices
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._i = np.empty(0, dtype=np.int64)
+        # Raw samples of the bucket still filling
+        self._px = np.empty(0)
+        self._py = np.empty(0)
+        self._pi = np.empty(0, dtype=np.int64)
+
+    def set_stride(self, stride):
+        if stride != self.stride:
+            self.stride = stride
+            self.reset()
+
+    def __call__(self, x, y, end, oldest=0):
+        """
+        x, y: the samples with absolute indices [end - len(y), end); samples
+        before self.end are skipped. oldest: absolute index of the oldest
+        sample still in the history. Returns the decimated (x, y) in time order.
+        """
+        s = self.stride
+        start = end - len(y)
+        if self.end > end or self.end < start:
+            # History was reset, or samples were missed: start over from these
+            self.reset()
+            self.end = start
+
+        skip = self.end - start
+        if skip < len(y):
+            px = np.concatenate([self._px, x[skip:]])
+            py = np.concatenate([self._py, y[skip:]])
+            pi = np.concatenate([self._pi, np.arange(self.end, end)])
+
+            # Samples before the first index of the filling bucket complete their buckets
+            done = np.searchsorted(pi, (end // s) * s)
+            if done:
+                bx, by, bi = self._reduce(px[:done], py[:done], pi[:done], s)
+                self._x = np.concatenate([self._x, bx])
+                self._y = np.concatenate([self._y, by])
+                self._i = np.concatenate([self._i, bi])
+            self._px, self._py, self._pi = px[done:], py[done:], pi[done:]
+            self.end = end
+
+        # Drop points that scrolled out of the history
+        keep = np.searchsorted(self._i, oldest)
+        if keep:
+            self._x, self._y, self._i = self._x[keep:], self._y[keep:], self._i[keep:]
+        keep = np.searchsorted(self._pi, oldest)
+        tail_x, tail_y, _ = self._reduce(self._px[keep:], self._py[keep:], self._pi[keep:], s)
+        return np.concatenate([self._x, tail_x]), np.concatenate([self._y, tail_y])
+
+    @staticmethod
+    def _reduce(x, y, i, s):
+        """Min and max of each bucket in x, y (absolute indices i), ordered by time within the bucket"""
+        if s <= 1 or len(y) == 0:
+            return x, y, i
+        starts = _group_starts(i, s)
+        n = len(y)
+        pos = np.arange(n)
+        group = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+
+        def first_where(values):
+            # First position in each bucket holding its extreme (bucket start if none, e.g. NaN)
+            found = np.minimum.reduceat(np.where(y == values[group], pos, n), starts)
+            return np.where(found < n, found, starts)
+
+        i_min = first_where(np.minimum.reduceat(y, starts))
+        i_max = first_where(np.maximum.reduceat(y, starts))
+        idx = np.column_stack([np.minimum(i_min, i_max), np.maximum(i_min, i_max)]).ravel()
+        return x[idx], y[idx], i[idx]
+
+
+class StrideSampler:
+    """
+    Every sample whose absolute index is a multiple of `stride`, for several
+    channels at once (e.g. a phase-plane trajectory, where a min/max reduction
+    along one axis would distort the curve). Fed incrementally like
+    MinMaxDecimator.
+    """
+    def __init__(self, stride=1):
+        self.stride = stride
+        self.reset()
+
+    def reset(self):
+        self.end = 0
+        self._columns = None
+        self._i = np.empty(0, dtype=np.int64)
+
+    def set_stride(self, stride):
+        if stride != self.stride:
+            self.stride = stride
+            self.reset()
+
+    def __call__(self, columns, end, oldest=0):
+        """
+        columns: equal-length arrays with absolute indices [end - n, end).
+        Returns the sampled arrays, oldest first.
+        """
+        start = end - len(columns[0])
+        if self.end > end or self.end < start:
+            self.reset()
+            self.end = start
+        if self._columns is None:
+            self._columns = [np.empty(0) for _ in columns]
+
+        skip = self.end - start
+        if skip < len(columns[0]):
+            idx = np.arange(self.end, end)
+            pick = np.flatnonzero(idx % self.stride == 0)
+            self._columns = [np.concatenate([cached, column[skip:][pick]])
+                             for cached, column in zip(self._columns, columns)]
+            self._i = np.concatenate([self._i, idx[pick]])
+            self.end = end
+
+        keep = np.searchsorted(self._i, oldest)
+        if keep:
+            self._columns = [cached[keep:] for cached in self._columns]
+            self._i = self._i[keep:]
+        return self._columns
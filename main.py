@@ -1,5 +1,72 @@
-from gui.app import App
+import argparse
+from core.startup import ImportProfiler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="NEXUS: Adaptive Hybrid Control System")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print a startup/import-time breakdown")
+    parser.add_argument("--headless", type=int, metavar="STEPS",
+                        help="run STEPS simulation steps without the GUI and exit")
+    parser.add_argument("--record", metavar="DIR",
+                        help="stream full-resolution telemetry to DIR (see core.recorder)")
+    parser.add_argument("--mode", choices=("HYBRID", "RL_TRAIN", "RL_INFERENCE"),
+                        help="control mode of a --headless run (RL_TRAIN trains inline)")
+    parser.add_argument("--checkpoint", metavar="DIR",
+                        help="restore the RL training state (weights, optimizers, replay) "
+                             "from DIR at start and save it there on exit (see core.checkpoint)")
+    args = parser.parse_args()
+    if args.headless is not None and args.headless <= 0:
+        parser.error("--headless needs a positive number of steps")
+    if args.mode is not None and args.headless is None:
+        parser.error("--mode needs --headless (the GUI selects the mode itself)")
+    return args
+
 
 if __name__ == "__main__":
-    app = App()
-    app.mainloop()
+    args = parse_args()
+
+    with ImportProfiler() as profiler:
+        if args.headless is not None:
+            from core.simulation import SimulationRunner
+            profiler.stage("import core.simulation")
+            runner = SimulationRunner()
+            profiler.stage("SimulationRunner()")
+        else:
+            from gui.app import App
+            profiler.stage("import gui.app")
+            app = App()
+            profiler.stage("App()")
+
+    if args.startup_report:
+        print(profiler.report())
+
+    if args.headless is None:
+        runner = app.runner
+    if args.record:
+        runner.start_recording(args.record)
+    checkpointer = None
+    if args.checkpoint:
+        checkpointer = runner.checkpointer(args.checkpoint)
+        if checkpointer.load():
+            print(f"[CKPT] Restored {args.checkpoint} ({checkpointer.agent.train_steps} train steps, "
+                  f"{checkpointer.agent.replay_buffer.size()} transitions)")
+    if args.mode is not None:
+        runner.controller.async_training = False # Train step by step with the run
+        runner.set_mode(args.mode)
+
+    try:
+        if args.headless is not None:
+            data = runner.run_headless(args.headless)
+            print(f"[SIM] {args.headless} steps | final POS={data['position'][-1]:.3f} "
+                  f"| TGT={data['target'][-1]:.2f}")
+        else:
+            app.mainloop()
+    finally:
+        if checkpointer is not None:
+            checkpointer.save(block=True)
+            print(f"[CKPT] Saved {args.checkpoint} ({checkpointer.agent.train_steps} train steps)")
+        recorder = runner.stop_recording()
+        if recorder is not None:
+            print(f"[REC] {recorder.rows_written} rows written to {args.record} "
+                  f"({recorder.dropped} dropped)")
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from core.wrapper import NATIVE_AVAILABLE, NativeController
+
+torch = pytest.importorskip("torch")
+pytestmark = pytest.mark.skipif(not NATIVE_AVAILABLE, reason="native controller library not built")
+
+from core.rl_agent import DDPGAgent
+
+
+@pytest.fixture
+def agent():
+    torch.manual_seed(0)
+    return DDPGAgent(state_dim=4, action_dim=1, max_action=10.0)
+
+
+def torch_actions(agent, states):
+    with torch.no_grad():
+        return agent.actor(torch.from_numpy(states.astype(np.float32))).double().numpy()
+
+
+def test_policy_action_matches_torch(agent):
+    # Random states spanning the plant's operating range; the native forward
+    # pass runs in float64 on the float32 weights
+    states = np.random.default_rng(0).uniform(-20.0, 20.0, size=(1000, 4))
+    native = NativeController()
+    native.load_policy(agent)
+    actions = np.array([native.policy_action(s) for s in states])
+    native.close()
+
+    assert np.max(np.abs(actions - torch_actions(agent, states))) < 1e-4
+
+
+def test_exported_policy_drives_rl_mode(agent, tmp_path):
+    path = tmp_path / "actor.bin"
+    agent.export_actor(str(path))
+    native = NativeController()
+    native.load_policy(str(path))
+    native.set_mode("RL_INFERENCE")
+
+    # RL mode applies the clipped actor output to the observation [pos, vel, target, error]
+    target = 5.0
+    _, u, alpha = native.step(target, 0.05)
+    expected = np.clip(torch_actions(agent, np.array([[0.0, 0.0, target, target]]))[0, 0], -10.0, 10.0)
+    native.close()
+
+    assert alpha == 0.0
+    assert abs(u - expected) < 1e-4
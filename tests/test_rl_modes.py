@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+pytest.importorskip("torch")
+
+import core.rl_agent
+from core.rl_agent import BATCH_SIZE, DDPGAgent
+from core.simulation import SimulationRunner
+
+
+class SlowAgent(DDPGAgent):
+    """
+    Stands in for the first RL use, where importing torch takes seconds.
+    Any second agent would finish last and replace the first one.
+    """
+    built = 0
+
+    def __init__(self, *args, **kwargs):
+        SlowAgent.built += 1
+        time.sleep(0.5 * SlowAgent.built)
+        super().__init__(*args, **kwargs)
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_rl_train_on_running_runner_trains_live_agent(monkeypatch):
+    monkeypatch.setattr(core.rl_agent, "DDPGAgent", SlowAgent)
+    monkeypatch.setattr(SlowAgent, "built", 0)
+    # Switch modes while the control thread is stepping, as the GUI does
+    runner = SimulationRunner(dt=0.01)
+    runner.start()
+    try:
+        assert wait_for(lambda: runner.sample_count > 10)
+        runner.set_mode("RL_TRAIN")
+        controller = runner.controller
+        learner = controller.learner
+        assert wait_for(lambda: learner.updates > 0)
+
+        agent = controller.rl_agent
+        assert SlowAgent.built == 1
+        assert learner.agent is agent
+        assert agent.replay_buffer.size() >= BATCH_SIZE
+        assert agent.train_steps > 0
+
+        runner.set_mode("HYBRID")
+        assert not learner.running
+    finally:
+        runner.stop()